@@ -1,7 +1,19 @@
 from fastapi import APIRouter
 
+from app.services.api_cache import cache_api
+
 router = APIRouter()
 
 @router.get("/")
 def get_admin():
     return {"message": "Admin API — ici on mettra les fonctions admin"}
+
+# Compteurs du cache de réponses de l'API
+@router.get("/cache")
+def get_cache_stats():
+    return cache_api.stats()
+
+@router.delete("/cache")
+def vider_cache():
+    cache_api.invalider(cache_api.generation)
+    return {"status": "success", "message": "Cache de l'API vidé"}
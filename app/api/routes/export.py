@@ -0,0 +1,41 @@
+from datetime import date
+from enum import Enum
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.services.export import exporter, nom_fichier
+from app.services.storage import dataset_existe
+
+router = APIRouter()
+
+
+class FormatExport(str, Enum):
+    csv = "csv"
+    parquet = "parquet"
+
+
+# Export du dataset nettoyé, envoyé en flux lot par lot (mémoire bornée)
+@router.get("/meteo")
+def export_meteo(
+    format: FormatExport = FormatExport.csv,
+    pays: Optional[List[str]] = Query(None),
+    ville: Optional[List[str]] = Query(None),
+    date_debut: Optional[date] = None,
+    date_fin: Optional[date] = None,
+    colonnes: Optional[str] = Query(None, description="Colonnes séparées par des virgules (ex. datetime,Ville,temp)"),
+    compression: Optional[str] = Query(None, description="csv : gzip ; parquet : snappy, zstd, gzip"),
+):
+    if not dataset_existe(settings.CLEAN_DATASET_DIR):
+        raise HTTPException(status_code=404, detail="Dataset nettoyé introuvable")
+    colonnes = [c.strip() for c in colonnes.split(",") if c.strip()] if colonnes else None
+    try:
+        flux, type_mime = exporter(format.value, colonnes, compression, pays=pays, villes=ville,
+                                   date_debut=date_debut, date_fin=date_fin)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    fichier = nom_fichier(format.value, compression)
+    return StreamingResponse(flux, media_type=type_mime,
+                             headers={"Content-Disposition": f'attachment; filename="{fichier}"'})
@@ -1,17 +1,120 @@
-from fastapi import APIRouter
-from app.services.collect import collect_data
+from datetime import date
+from enum import Enum
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal, async_engine, get_async_db
+from app.core.villes import REGISTRE
+from app.models.schemas import VillesResponse
+from app.services.api_cache import reponse_conditionnelle, reponse_en_cache
+from app.services.warehouse import (
+    COLONNES_CLES, decoder_curseur, en_colonnes, flux_csv, flux_ndjson, iterer_meteo,
+    lire_page_meteo, valider_colonnes,
+)
 
 router = APIRouter()
 
-# Endpoint pour toutes les données
+LIMITE_PAGE = 10_000
+LIMITE_PAGE_MAX = 100_000
+
+
+class FormatReponse(str, Enum):
+    json = "json"
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+class Disposition(str, Enum):
+    lignes = "lignes"         # [{colonne: valeur}, ...]
+    colonnes = "colonnes"     # {colonne: [valeurs]}, plus compact
+
+
+def _colonnes(colonnes: Optional[str]):
+    return [c.strip() for c in colonnes.split(",") if c.strip()] if colonnes else None
+
+
+async def _repondre(db, request, format, disposition, curseur, limit, **filtres):
+    """
+    json : une page de `limit` lignes (mise en cache), par lignes ou par colonnes,
+    le curseur de la suivante dans l'en-tête X-Next-Cursor.
+    ndjson / csv : toutes les lignes (à partir de `curseur`) envoyées au fil du curseur serveur.
+    """
+    try:
+        colonnes = valider_colonnes(filtres["colonnes"])
+        apres = decoder_curseur(curseur) if curseur else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if format is FormatReponse.json:
+        async def produire():
+            lignes, suivant = await lire_page_meteo(db, limit or LIMITE_PAGE, curseur, **filtres)
+            if disposition is Disposition.colonnes:
+                lignes = en_colonnes(lignes, [*COLONNES_CLES, *colonnes])
+            return lignes, {"X-Next-Cursor": suivant} if suivant else None
+        return await reponse_en_cache(request, produire, async_engine)
+
+    non_modifiee, version = await reponse_conditionnelle(request, async_engine)
+    if non_modifiee:
+        return non_modifiee
+    lots = iterer_meteo(AsyncSessionLocal, apres=apres, limit=limit, **filtres)
+    if format is FormatReponse.ndjson:
+        return StreamingResponse(flux_ndjson(lots), media_type="application/x-ndjson", headers=version)
+    return StreamingResponse(flux_csv(lots, [*COLONNES_CLES, *colonnes]), media_type="text/csv",
+                             headers={**version, "Content-Disposition": 'attachment; filename="meteo.csv"'})
+
+
+def _ville_du_registre(id_ville: int):
+    try:
+        return REGISTRE.par_id(id_ville)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Ville {id_ville} absente du référentiel")
+
+
+# Référentiel des villes suivies (identifiants stables, coordonnées)
+@router.get("/villes", response_model=VillesResponse)
+async def get_villes(pays: Optional[str] = None):
+    return {"villes": [v._asdict() for v in REGISTRE.filtrer([pays] if pays else None)]}
+
+# Endpoint pour toutes les données (lecture dans l'entrepôt, filtres optionnels)
 @router.get("/")
-def get_all_meteo():
-    return collect_data()
+async def get_all_meteo(
+    request: Request,
+    pays: Optional[str] = None,
+    ville: Optional[str] = None,
+    id_ville: Optional[int] = Query(None, description="Identifiant du référentiel (remplace pays et ville)"),
+    date_debut: Optional[date] = None,
+    date_fin: Optional[date] = None,
+    colonnes: Optional[str] = Query(None, description="Colonnes séparées par des virgules (ex. temp,precip)"),
+    format: FormatReponse = FormatReponse.json,
+    disposition: Disposition = Disposition.lignes,
+    curseur: Optional[str] = Query(None, description="Curseur X-Next-Cursor de la page précédente"),
+    limit: Optional[int] = Query(None, ge=1, le=LIMITE_PAGE_MAX,
+                                 description=f"Taille de page en json (défaut {LIMITE_PAGE}), sans limite en flux"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if id_ville is not None:
+        v = _ville_du_registre(id_ville)
+        pays, ville = v.pays, v.ville
+    return await _repondre(db, request, format, disposition, curseur, limit, pays=pays, ville=ville,
+                           date_debut=date_debut, date_fin=date_fin, colonnes=_colonnes(colonnes))
 
 # Endpoint pour une ville spécifique
-@router.get("/ville/{Dakar}")
-def get_meteo_ville(Dakar: str):
-    data = collect_data()
-    # Filtrer la ville demandée
-    ville_data = [d for d in data if d["ville"].lower() == Dakar.lower()]
-    return ville_data
+@router.get("/ville/{ville}")
+async def get_meteo_ville(
+    request: Request,
+    ville: str,
+    date_debut: Optional[date] = None,
+    date_fin: Optional[date] = None,
+    colonnes: Optional[str] = Query(None, description="Colonnes séparées par des virgules (ex. temp,precip)"),
+    format: FormatReponse = FormatReponse.json,
+    disposition: Disposition = Disposition.lignes,
+    curseur: Optional[str] = Query(None, description="Curseur X-Next-Cursor de la page précédente"),
+    limit: Optional[int] = Query(None, ge=1, le=LIMITE_PAGE_MAX,
+                                 description=f"Taille de page en json (défaut {LIMITE_PAGE}), sans limite en flux"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await _repondre(db, request, format, disposition, curseur, limit, ville=ville,
+                           date_debut=date_debut, date_fin=date_fin, colonnes=_colonnes(colonnes))
@@ -1,10 +1,82 @@
-from fastapi import APIRouter
+from datetime import date
+from enum import Enum
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import async_engine, get_async_db
+from app.models.schemas import StatsEvolutionResponse, StatsPaysResponse, StatsResponse
+from app.services.api_cache import reponse_en_cache
+from app.services.rollups import (
+    construire_requete_evolution, construire_requete_resume,
+)
 
 # Créer le router pour ce fichier
 router = APIRouter()
 
-# Endpoint simple pour tester
-@router.get("/")
-def get_stats():
-    return {"message": "Stats API — ici on mettra les statistiques météo"}
 
+class Niveau(str, Enum):
+    ville = "ville"
+    pays = "pays"
+
+
+class Grain(str, Enum):
+    jour = "jour"
+    mois = "mois"
+    annee = "annee"
+
+
+async def _lignes(db, sql, params):
+    result = await db.execute(text(sql), params)
+    return [dict(row) for row in result.mappings()]
+
+
+# Résumé par ville (agrégats pré-calculés)
+@router.get("/", response_model=StatsResponse)
+async def get_stats(
+    request: Request,
+    pays: Optional[str] = None,
+    ville: Optional[str] = None,
+    date_debut: Optional[date] = None,
+    date_fin: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    async def produire():
+        sql, params = construire_requete_resume("ville", pays, ville, date_debut, date_fin)
+        return StatsResponse(summary=await _lignes(db, sql, params)), None
+    return await reponse_en_cache(request, produire, async_engine)
+
+# Résumé par pays
+@router.get("/pays", response_model=StatsPaysResponse)
+async def get_stats_pays(
+    request: Request,
+    pays: Optional[str] = None,
+    date_debut: Optional[date] = None,
+    date_fin: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    async def produire():
+        sql, params = construire_requete_resume("pays", pays, None, date_debut, date_fin)
+        return StatsPaysResponse(summary=await _lignes(db, sql, params)), None
+    return await reponse_en_cache(request, produire, async_engine)
+
+# Série journalière / mensuelle / annuelle par ville ou par pays
+@router.get("/evolution", response_model=StatsEvolutionResponse)
+async def get_stats_evolution(
+    request: Request,
+    niveau: Niveau = Niveau.pays,
+    grain: Grain = Grain.mois,
+    pays: Optional[str] = None,
+    ville: Optional[str] = None,
+    date_debut: Optional[date] = None,
+    date_fin: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    if ville and niveau is Niveau.pays:
+        raise HTTPException(status_code=400, detail="Le filtre ville requiert niveau=ville")
+    async def produire():
+        sql, params = construire_requete_evolution(niveau.value, grain.value, pays, ville, date_debut, date_fin)
+        return StatsEvolutionResponse(grain=grain.value, series=await _lignes(db, sql, params)), None
+    return await reponse_en_cache(request, produire, async_engine)
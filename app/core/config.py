@@ -15,11 +15,67 @@ class Settings(BaseSettings):
     
     # Base de données PostgreSQL (adapte selon ton setup)
     DATABASE_URL: str = "postgresql+psycopg2://postgres:@localhost:5432/entrepot_uemoa"
+    # Même base, pilote asyncpg (couche asynchrone de l'API)
+    ASYNC_DATABASE_URL: str = "postgresql+asyncpg://postgres:@localhost:5432/entrepot_uemoa"
+
+    # Pool de connexions
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0      # secondes d'attente d'une connexion libre
+    DB_POOL_RECYCLE: int = 1800        # secondes avant de renouveler une connexion
+    DB_POOL_PRE_PING: bool = True
     
-    # Chemins des fichiers CSV (tu peux les changer plus tard)
+    # Datasets Parquet partitionnés (Pays/annee/mois), lus par toutes les étapes
+    RAW_DATASET_DIR: str = str(BASE_DIR / "data" / "raw" / "meteo")
+    CLEAN_DATASET_DIR: str = str(BASE_DIR / "data" / "clean" / "meteo")
+    TRANSFORM_CHUNK_SIZE: int = 500_000        # lignes par bloc du nettoyage en flux
+
+    # Chemins des exports CSV (tu peux les changer plus tard)
     RAW_CSV_PATH: str = str(BASE_DIR / "data" / "historique_meteo_uemoa_80villes.csv")
     CLEAN_CSV_PATH: str = str(BASE_DIR / "data" / "historique_meteo_uemoa_80villes_clean.csv")
-    
+
+    # Collecte Open-Meteo (requêtes concurrentes + limiteur de débit)
+    OPENMETEO_ARCHIVE_URL: str = "https://archive-api.open-meteo.com/v1/archive"
+    OPENMETEO_START_DATE: str = "2025-01-01"
+    OPENMETEO_BATCH_SIZE: int = 10         # coordonnées par requête multi-lieux
+    OPENMETEO_MAX_CONCURRENCY: int = 8
+    OPENMETEO_RATE_LIMIT: float = 5.0      # requêtes par seconde (débit moyen)
+    OPENMETEO_BURST: int = 5               # capacité du seau de jetons
+    OPENMETEO_MAX_RETRIES: int = 4
+    OPENMETEO_BACKOFF_BASE: float = 1.0    # secondes, doublé à chaque tentative
+    OPENMETEO_TIMEOUT: float = 30.0
+
+    # Cache disque des réponses de l'API archive
+    OPENMETEO_CACHE_ENABLED: bool = True
+    OPENMETEO_CACHE_DIR: str = str(BASE_DIR / "data" / "cache" / "openmeteo")
+    OPENMETEO_CACHE_TTL_RECENT: int = 3600     # secondes, plages touchant les jours récents
+    OPENMETEO_CACHE_RECENT_DAYS: int = 7       # au-delà, une plage passée n'expire jamais
+
+    # Collecte incrémentale : dernière date collectée par (Pays, Ville)
+    WATERMARK_PATH: str = str(BASE_DIR / "data" / "watermarks.json")
+
+    # Cache mémoire des réponses de l'API (invalidé à chaque chargement de l'entrepôt)
+    API_CACHE_ENABLED: bool = True
+    API_CACHE_TTL: int = 3600                  # secondes
+    API_CACHE_MAX_ENTRIES: int = 1024
+    API_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    API_CACHE_GENERATION_POLL: float = 5.0     # secondes entre deux lectures de la génération
+    API_HTTP_MAX_AGE: int = 300                # Cache-Control max-age des réponses (proxys, clients)
+
+    # Compression des réponses (Brotli, gzip si le client ne l'accepte pas)
+    API_COMPRESSION_MIN_SIZE: int = 1024       # octets, en dessous la réponse n'est pas compressée
+    API_BROTLI_QUALITY: int = 4                # 0-11 : 4 ≈ vitesse de gzip, meilleur ratio
+
+    # Cache mémoire du tableau de bord Dash (tranches filtrées, figures), par processus
+    DASH_CACHE_TTL: int = 3600                 # secondes
+    DASH_CACHE_MAX_ENTRIES: int = 256
+    DASH_CACHE_MAX_BYTES: int = 128 * 1024 * 1024
+    DASH_CACHE_VERSION_POLL: float = 5.0       # secondes entre deux contrôles de version du dataset
+    DASH_POINTS_GRAPHE: int = 1500             # points max par courbe (≈ largeur d'un graphique en pixels)
+
+    # Export en flux du dataset nettoyé (API et tableau de bord)
+    EXPORT_TAILLE_LOT: int = 50_000            # lignes par lot lu, écrit puis envoyé
+
     model_config = SettingsConfigDict(
         env_file=".env",          # optionnel : tu pourras ajouter un .env plus tard
         env_file_encoding="utf-8",
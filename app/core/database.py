@@ -1,19 +1,59 @@
 # app/core/database.py
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
+POOL_OPTIONS = {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT,
+    "pool_recycle": settings.DB_POOL_RECYCLE,
+    "pool_pre_ping": settings.DB_POOL_PRE_PING,
+}
+
 engine = create_engine(
     settings.DATABASE_URL,
     # echo=True,   # décommente pour voir les requêtes SQL (debug)
+    **POOL_OPTIONS,
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Moteur asynchrone (asyncpg) utilisé par les routes : les accès base ne bloquent pas la boucle
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    **POOL_OPTIONS,
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    """Dépendance FastAPI : une session asynchrone par requête."""
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+async def init_db():
+    """Au démarrage : ouvre une première connexion du pool et vérifie la base."""
+    async with async_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def close_db():
+    """À l'arrêt : ferme toutes les connexions du pool."""
+    await async_engine.dispose()
@@ -0,0 +1,36 @@
+# app/core/responses.py
+"""
+Sérialisation JSON rapide (orjson) des réponses de l'API.
+
+orjson sérialise nativement dates, datetimes et tableaux numpy, sans passer
+par jsonable_encoder. Les modèles pydantic sont convertis en dict au passage,
+les Decimal (colonnes NUMERIC de PostgreSQL) en float.
+"""
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+OPTIONS_ORJSON = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _defaut(objet):
+    if isinstance(objet, BaseModel):
+        return objet.model_dump()
+    if isinstance(objet, Decimal):
+        return float(objet)
+    raise TypeError(f"Type non sérialisable : {type(objet).__name__}")
+
+
+def dumps_json(contenu: Any) -> bytes:
+    """Contenu sérialisé en JSON (UTF-8, compact)."""
+    return orjson.dumps(contenu, default=_defaut, option=OPTIONS_ORJSON)
+
+
+class ReponseORJSON(JSONResponse):
+    """Réponse JSON par défaut de l'application, sérialisée par orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
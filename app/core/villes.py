@@ -0,0 +1,95 @@
+# app/core/villes.py
+"""
+Référentiel des villes UEMOA suivies par la collecte Open-Meteo.
+
+Les 80 villes (10 par pays) sont lues depuis villes_uemoa.csv, avec un
+identifiant entier stable par ville : ajouter une ville se fait en fin de
+fichier avec un nouvel identifiant, sans renuméroter les autres. Collecte,
+chargement, API et tableau de bord partagent ce référentiel ; les jointures
+et filtres peuvent porter sur `id_ville` plutôt que sur les libellés.
+"""
+import csv
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+FICHIER_VILLES = Path(__file__).with_name("villes_uemoa.csv")
+
+
+class Ville(NamedTuple):
+    id: int
+    pays: str
+    ville: str
+    lat: float
+    lon: float
+
+
+class RegistreVilles:
+    """Villes indexées par identifiant et par (pays, ville), coordonnées en tableaux numpy."""
+
+    def __init__(self, villes):
+        self.villes = tuple(sorted(villes, key=lambda v: v.id))
+        self.ids = np.array([v.id for v in self.villes], dtype="int16")
+        self.latitudes = np.array([v.lat for v in self.villes])
+        self.longitudes = np.array([v.lon for v in self.villes])
+        self.pays = list(dict.fromkeys(v.pays for v in self.villes))
+        self._par_id = {v.id: v for v in self.villes}
+        self._par_nom = {(v.pays, v.ville): v for v in self.villes}
+        if len(self._par_id) != len(self.villes) or len(self._par_nom) != len(self.villes):
+            raise ValueError("Référentiel des villes : identifiants ou (pays, ville) en double")
+
+    @classmethod
+    def depuis_csv(cls, chemin=FICHIER_VILLES):
+        with open(chemin, encoding="utf-8", newline="") as f:
+            return cls(Ville(int(l["id"]), l["pays"], l["ville"], float(l["lat"]), float(l["lon"]))
+                       for l in csv.DictReader(f))
+
+    def __len__(self):
+        return len(self.villes)
+
+    def __iter__(self):
+        return iter(self.villes)
+
+    def par_id(self, id_ville):
+        return self._par_id[id_ville]
+
+    def trouver(self, pays, ville):
+        """Ville (pays, ville) du référentiel, ou None."""
+        return self._par_nom.get((pays, ville))
+
+    def villes_du_pays(self, pays):
+        return [v for v in self.villes if v.pays == pays]
+
+    def filtrer(self, pays_selectionnes=None):
+        """Villes des pays demandés (toutes si vide)."""
+        if not pays_selectionnes:
+            return list(self.villes)
+        return [v for v in self.villes if v.pays in pays_selectionnes]
+
+    def identifier(self, pays, villes):
+        """
+        Identifiants (int16, -1 si inconnue) de séries Pays / Ville alignées.
+        La correspondance n'est faite qu'une fois par couple distinct.
+        """
+        codes, couples = pd.MultiIndex.from_arrays([pays, villes]).factorize()
+        ids = np.array([getattr(self._par_nom.get((p, v)), "id", -1) for p, v in couples], dtype="int16")
+        return np.where(codes >= 0, ids[codes], -1).astype("int16")
+
+
+REGISTRE = RegistreVilles.depuis_csv()
+
+# === Villes UEMOA par pays (forme historique du référentiel)
+VILLES_UEMOA = {
+    pays: [{"ville": v.ville, "lat": v.lat, "lon": v.lon} for v in REGISTRE.villes_du_pays(pays)]
+    for pays in REGISTRE.pays
+}
+
+
+def lister_villes(pays_selectionnes=None):
+    """
+    Aplatit le référentiel en une liste de villes
+    ({"id", "pays", "ville", "lat", "lon"}), filtrée sur les pays demandés.
+    """
+    return [v._asdict() for v in REGISTRE.filtrer(pays_selectionnes)]
@@ -1,21 +1,39 @@
 # app/main.py
-from fastapi import FastAPI, Depends
-from fastapi.responses import JSONResponse
-from app.api.routes import meteo, stats, admin
+from brotli_asgi import BrotliMiddleware
+from typing import List
+
+from fastapi import FastAPI, Depends, HTTPException, Response
+from app.api.routes import meteo, stats, admin, export
 from app.core.config import settings
+from app.core.responses import ReponseORJSON
+from app.core.database import async_engine, init_db, close_db
+from app.models.schemas import JobResponse, JobStatus
 from app.utils.logger import logger
-from app.services.collect import run_collection
+from app.services.jobs import gestionnaire_jobs
+from app.services.rollups import creer_agregats
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="API de gestion des données météo UEMOA",
     version="0.1.0",
+    default_response_class=ReponseORJSON,
+)
+
+# Compression Brotli (gzip en repli) des réponses au-delà du seuil
+# (sauf les exports, déjà compressés à la demande : gzip, zstd, snappy)
+app.add_middleware(
+    BrotliMiddleware,
+    quality=settings.API_BROTLI_QUALITY,
+    minimum_size=settings.API_COMPRESSION_MIN_SIZE,
+    gzip_fallback=True,
+    excluded_handlers=[settings.API_V1_STR + "/export"],
 )
 
 # Inclusion des routers
 app.include_router(meteo.router, prefix=settings.API_V1_STR + "/meteo", tags=["meteo"])
 app.include_router(stats.router, prefix=settings.API_V1_STR + "/stats", tags=["stats"])
 app.include_router(admin.router, prefix=settings.API_V1_STR + "/admin", tags=["admin"])
+app.include_router(export.router, prefix=settings.API_V1_STR + "/export", tags=["export"])
 
 
 @app.get("/")
@@ -23,23 +41,42 @@ def read_root():
     return {"message": f"Bienvenue sur {settings.PROJECT_NAME}"}
 
 
-@app.post("/trigger-collect", response_model=dict)
-def trigger_collect():
-    try:
-        result = run_collection()
-        return result
-    except Exception as e:
-        return JSONResponse(
-            status_code=500,
-            content={"status": "error", "message": str(e)}
-        )
+@app.post("/trigger-collect", response_model=JobResponse, status_code=202)
+def trigger_collect(response: Response, incremental: bool = True):
+    """Met en file une exécution collecte → nettoyage → chargement et rend la main aussitôt."""
+    job, nouveau = gestionnaire_jobs.soumettre(incremental=incremental)
+    if not nouveau:
+        response.status_code = 200
+        return {"status": "running", "message": "Une exécution est déjà en cours", "job": job.etat()}
+    return {"status": "accepted", "message": f"Job {job.id} en file", "job": job.etat()}
+
+
+@app.get("/jobs", response_model=List[JobStatus])
+def list_jobs():
+    return [job.etat() for job in gestionnaire_jobs.lister()]
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+def get_job(job_id: str):
+    job = gestionnaire_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job inconnu : {job_id}")
+    return job.etat()
 
 
 @app.on_event("startup")
 async def startup_event():
+    try:
+        await init_db()
+        logger.info("Connexion à la base établie (pool asyncpg)")
+        await creer_agregats(async_engine)
+    except Exception as e:
+        logger.error(f"Base de données injoignable au démarrage : {e}")
     logger.info("API démarrée")
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    gestionnaire_jobs.arreter()
+    await close_db()
     logger.info("API arrêtée")
\ No newline at end of file
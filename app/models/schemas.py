@@ -1,6 +1,6 @@
 # app/models/schemas.py
 from pydantic import BaseModel
-from datetime import date
+from datetime import date, datetime
 from typing import Optional, List
 
 
@@ -13,14 +13,83 @@ class CollectResponse(MessageResponse):
     rows_collected: Optional[int] = None
 
 
+class JobStatus(BaseModel):
+    id: str
+    statut: str                      # en_attente, en_cours, termine, echec
+    etape: Optional[str] = None      # collecte, transformation, chargement
+    incremental: bool
+    cree_le: datetime
+    debut: Optional[datetime] = None
+    fin: Optional[datetime] = None
+    villes_total: int
+    villes_traitees: int
+    lignes_collectees: int
+    lignes_nettoyees: int
+    lignes_chargees: int
+    erreurs: List[str]
+    message: Optional[str] = None
+
+
+class JobResponse(BaseModel):
+    status: str
+    message: str
+    job: JobStatus
+
+
 class StatsSummary(BaseModel):
     ville: str
     pays: str
-    temp_moyenne: float
+    temp_moyenne: Optional[float] = None
     precip_total: float
     date_debut: date
     date_fin: date
+    temp_min: Optional[float] = None
+    temp_max: Optional[float] = None
+    nb_jours: Optional[int] = None
 
 
 class StatsResponse(BaseModel):
-    summary: List[StatsSummary]
\ No newline at end of file
+    summary: List[StatsSummary]
+
+
+class StatsPaysSummary(BaseModel):
+    pays: str
+    temp_moyenne: Optional[float] = None
+    temp_min: Optional[float] = None
+    temp_max: Optional[float] = None
+    precip_total: float
+    nb_jours: int
+    date_debut: date
+    date_fin: date
+
+
+class StatsPaysResponse(BaseModel):
+    summary: List[StatsPaysSummary]
+
+
+class StatsPeriode(BaseModel):
+    periode: date
+    pays: str
+    ville: Optional[str] = None
+    temp_moyenne: Optional[float] = None
+    temp_min: Optional[float] = None
+    temp_max: Optional[float] = None
+    precip_total: float
+    nb_jours: int
+
+
+class StatsEvolutionResponse(BaseModel):
+    grain: str
+    series: List[StatsPeriode]
+
+
+class VilleSchema(BaseModel):
+    id: int
+    pays: str
+    ville: str
+    lat: float
+    lon: float
+
+
+class VillesResponse(BaseModel):
+    villes: List[VilleSchema]
@@ -0,0 +1,216 @@
+# app/services/api_cache.py
+"""
+Cache mémoire des réponses JSON de l'API (routers meteo et stats).
+
+Cache LRU borné en nombre d'entrées et en octets, avec une durée de vie par
+entrée. Les données ne changent qu'au chargement de l'entrepôt : chaque
+chargement incrémente un compteur de génération (table meta_entrepot, voir
+`incrementer_generation` dans load.py). Le cache relit ce compteur au plus
+toutes les API_CACHE_GENERATION_POLL secondes et se vide quand il change.
+Les réponses sont stockées déjà sérialisées : un hit ne coûte ni requête ni
+sérialisation.
+
+La même version de l'entrepôt (génération, date du dernier chargement) sert
+aux requêtes conditionnelles HTTP : ETag / Last-Modified sur chaque réponse,
+304 sur If-None-Match / If-Modified-Since sans exécuter la requête, et
+Cache-Control pour les proxys inverses.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.responses import dumps_json
+
+logger = logging.getLogger(__name__)
+
+SQL_VERSION = "SELECT cle, valeur FROM meta_entrepot WHERE cle IN ('generation', 'charge_le')"
+
+
+class CacheLRU:
+    """Cache clé -> valeur avec TTL, éviction LRU et limite en octets."""
+
+    def __init__(self, max_entrees=None, max_octets=None, ttl=None):
+        self.max_entrees = max_entrees or settings.API_CACHE_MAX_ENTRIES
+        self.max_octets = max_octets or settings.API_CACHE_MAX_BYTES
+        self.ttl = settings.API_CACHE_TTL if ttl is None else ttl
+        self.generation = None
+        self._entrees = OrderedDict()   # cle -> (expire_le, taille, valeur)
+        self._verrou = threading.Lock()
+        self.octets = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, cle):
+        """Valeur en cache (et marquée récemment utilisée), ou None."""
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is None:
+                self.misses += 1
+                return None
+            if entree[0] < time.monotonic():
+                self._retirer(cle)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entrees.move_to_end(cle)
+            self.hits += 1
+            return entree[2]
+
+    def set(self, cle, valeur, taille, ttl=None):
+        """Ajoute une entrée de `taille` octets ; évince les moins récentes si besoin."""
+        if taille > self.max_octets:
+            return
+        expire_le = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._verrou:
+            if cle in self._entrees:
+                self._retirer(cle)
+            self._entrees[cle] = (expire_le, taille, valeur)
+            self.octets += taille
+            while len(self._entrees) > self.max_entrees or self.octets > self.max_octets:
+                self._retirer(next(iter(self._entrees)))
+                self.evictions += 1
+
+    def _retirer(self, cle):
+        _, taille, _ = self._entrees.pop(cle)
+        self.octets -= taille
+
+    def invalider(self, generation=None):
+        """Vide le cache et adopte la nouvelle génération."""
+        with self._verrou:
+            self._entrees.clear()
+            self.octets = 0
+            self.generation = generation
+            self.invalidations += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entrees),
+            "bytes": self.octets,
+            "max_entries": self.max_entrees,
+            "max_bytes": self.max_octets,
+            "generation": self.generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / total, 3) if total else None,
+        }
+
+
+cache_api = CacheLRU()
+_dernier_controle = 0.0
+# Date du dernier chargement (UTC, à la seconde), None avant le premier chargement lu
+_charge_le = None
+
+
+async def verifier_generation(engine):
+    """Vide le cache si un chargement a eu lieu depuis la dernière lecture de la génération."""
+    global _dernier_controle, _charge_le
+    maintenant = time.monotonic()
+    if maintenant - _dernier_controle < settings.API_CACHE_GENERATION_POLL:
+        return
+    _dernier_controle = maintenant
+    try:
+        async with engine.connect() as conn:
+            version = dict((await conn.execute(text(SQL_VERSION))).all())
+    except Exception as e:
+        # Table absente (aucun chargement encore) ou base injoignable : cache conservé
+        logger.debug(f"Génération de l'entrepôt illisible : {e}")
+        return
+    generation = version.get("generation")
+    if "charge_le" in version:
+        _charge_le = datetime.fromtimestamp(version["charge_le"], tz=timezone.utc)
+    if generation != cache_api.generation:
+        if cache_api.generation is not None:
+            logger.info(f"🔄 Entrepôt rechargé (génération {generation}) : cache de l'API vidé")
+        cache_api.invalider(generation)
+
+
+# === Requêtes conditionnelles HTTP ===
+def en_tetes_version():
+    """ETag, Last-Modified et Cache-Control de la version courante de l'entrepôt."""
+    en_tetes = {"Cache-Control": f"public, max-age={settings.API_HTTP_MAX_AGE}"}
+    if cache_api.generation is not None:
+        # Faible : la même version peut être servie compressée ou non
+        en_tetes["ETag"] = f'W/"g{cache_api.generation}"'
+    if _charge_le is not None:
+        en_tetes["Last-Modified"] = format_datetime(_charge_le, usegmt=True)
+    return en_tetes
+
+
+def est_non_modifiee(request: Request, en_tetes):
+    """
+    Vrai si la copie du client est à jour : If-None-Match prime sur
+    If-Modified-Since (RFC 9110, section 13.2.2).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etag = en_tetes.get("ETag")
+        etiquettes = {e.strip().removeprefix("W/") for e in if_none_match.split(",")}
+        return etag is not None and ("*" in etiquettes or etag.removeprefix("W/") in etiquettes)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and _charge_le is not None:
+        try:
+            return _charge_le <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+async def reponse_conditionnelle(request: Request, engine):
+    """
+    (reponse_304 ou None, en-têtes de version) : la réponse 304 est à renvoyer
+    telle quelle, sans exécuter la requête.
+    """
+    await verifier_generation(engine)
+    en_tetes = en_tetes_version()
+    if est_non_modifiee(request, en_tetes):
+        return Response(status_code=304, headers=en_tetes), en_tetes
+    return None, en_tetes
+
+
+def cle_requete(request: Request):
+    """Clé de cache : chemin et paramètres de requête triés."""
+    return request.url.path, tuple(sorted(request.query_params.multi_items()))
+
+
+async def reponse_en_cache(request: Request, producteur, engine, ttl=None):
+    """
+    Réponse JSON de `producteur()` (coroutine renvoyant (donnees, en_tetes)),
+    servie depuis le cache si elle y est encore valide, ou 304 si le client
+    a déjà la version courante.
+    """
+    non_modifiee, version = await reponse_conditionnelle(request, engine)
+    if non_modifiee:
+        return non_modifiee
+
+    if not settings.API_CACHE_ENABLED:
+        donnees, en_tetes = await producteur()
+        return Response(dumps_json(donnees), media_type="application/json",
+                        headers={**version, **(en_tetes or {})})
+
+    cle = cle_requete(request)
+    entree = cache_api.get(cle)
+    if entree is None:
+        generation = cache_api.generation
+        donnees, en_tetes = await producteur()
+        entree = (dumps_json(donnees), en_tetes or {})
+        # Une invalidation survenue pendant la requête rend la réponse périmée
+        if cache_api.generation == generation:
+            taille = len(entree[0]) + sum(len(k) + len(v) for k, v in entree[1].items())
+            cache_api.set(cle, entree, taille, ttl)
+    corps, en_tetes = entree
+    return Response(corps, media_type="application/json", headers={**version, **en_tetes})
+
@@ -0,0 +1,84 @@
+# app/services/clustering.py
+"""
+Méthode du coude K-Means, un modèle par valeur de k ajusté en parallèle.
+
+Les ajustements sont indépendants : ils tournent dans un pool de processus.
+Les données ne sont pas copiées dans chaque processus : elles sont écrites une
+fois dans un fichier .npy temporaire que les workers ouvrent en mémoire mappée
+(pages partagées par le système). Chaque worker limite ses threads OpenMP/BLAS
+à sa part des cœurs pour éviter la sursouscription.
+
+Au-delà de SEUIL_MINIBATCH lignes, MiniBatchKMeans remplace KMeans : chaque
+itération ne lit qu'un lot de lignes, ce qui garde le balayage praticable sur
+des dizaines de millions d'observations. Les modèles renvoyés servent
+directement (inertie pour le coude, `predict` pour le k retenu) : aucun
+ajustement n'est refait.
+"""
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from threadpoolctl import threadpool_limits
+
+logger = logging.getLogger(__name__)
+
+SEUIL_MINIBATCH = 1_000_000    # lignes à partir desquelles MiniBatchKMeans est utilisé
+TAILLE_LOT_MINIBATCH = 4096
+RANDOM_STATE = 42
+
+_X = None   # données du worker (mémoire mappée)
+
+
+def creer_modele(k, mini_batch=False):
+    if mini_batch:
+        return MiniBatchKMeans(n_clusters=k, init='k-means++', batch_size=TAILLE_LOT_MINIBATCH,
+                               n_init=3, random_state=RANDOM_STATE)
+    return KMeans(n_clusters=k, init='k-means++', random_state=RANDOM_STATE)
+
+
+def _ajuster(X, k, mini_batch):
+    modele = creer_modele(k, mini_batch).fit(X)
+    # Une étiquette par ligne : inutile de la renvoyer au processus principal
+    del modele.labels_
+    return k, modele
+
+
+def _initialiser_worker(chemin, nb_threads):
+    global _X
+    _X = np.load(chemin, mmap_mode='r')
+    threadpool_limits(limits=nb_threads)
+
+
+def _ajuster_worker(k, mini_batch):
+    return _ajuster(_X, k, mini_batch)
+
+
+def balayer_k(X, ks=range(1, 11), mini_batch=None, nb_processus=None):
+    """
+    Ajuste un modèle par valeur de `ks` et retourne {k: modèle ajusté}.
+    `mini_batch` : None pour choisir selon la taille de X ; `nb_processus` :
+    None pour un processus par cœur (au plus un par k).
+    """
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    ks = list(ks)
+    mini_batch = len(X) >= SEUIL_MINIBATCH if mini_batch is None else mini_batch
+    nb_coeurs = os.cpu_count() or 1
+    nb_processus = max(1, min(len(ks), nb_processus or nb_coeurs))
+    algo = "MiniBatchKMeans" if mini_batch else "KMeans"
+    logger.info(f"Méthode du coude : {algo}, k = {ks[0]}..{ks[-1]}, {len(X)} lignes, {nb_processus} processus")
+
+    if nb_processus == 1:
+        modeles = dict(_ajuster(X, k, mini_batch) for k in ks)
+    else:
+        with tempfile.TemporaryDirectory() as dossier:
+            chemin = os.path.join(dossier, "X.npy")
+            np.save(chemin, X)
+            with ProcessPoolExecutor(nb_processus, initializer=_initialiser_worker,
+                                     initargs=(chemin, max(1, nb_coeurs // nb_processus))) as pool:
+                # Les k les plus grands (ajustements les plus longs) partent en premier
+                ordre = sorted(ks, reverse=True)
+                modeles = dict(pool.map(_ajuster_worker, ordre, [mini_batch] * len(ordre)))
+    return {k: modeles[k] for k in ks}
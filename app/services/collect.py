@@ -1,22 +1,72 @@
-# app/api/routes/meteo.py
-from fastapi import APIRouter
-from app.services.collect import run_collection  # <- on importe la bonne fonction
+# app/services/collect.py
+from datetime import datetime
+
+import pandas as pd
+
+from app.core.config import settings
+from app.core.villes import lister_villes
+from app.services.openmeteo import collecter_villes
+from app.services.storage import dataset_existe, ecrire_parquet
+from app.services.watermark import WatermarkStore, collecter_incremental
 from app.utils.logger import logger
 
-router = APIRouter(
-    prefix="/meteo",
-    tags=["Météo"]
-)
 
-@router.get("/collect")
-async def collect_meteo():
+def collecter_dataframe(pays_selectionnes=None, start_date=None, end_date=None, incremental=False,
+                        progression=None):
     """
-    Endpoint pour lancer la collecte des données météo.
+    Collecte l'historique Open-Meteo des villes UEMOA via le moteur asynchrone.
+    En mode incrémental, seuls les jours postérieurs à la marque de chaque ville
+    sont demandés. `progression` reçoit le nombre de villes traitées au fil de
+    la collecte. Retourne (DataFrame, echecs, marques) : en mode incrémental,
+    `marques` est le WatermarkStore déjà avancé en mémoire, à sauvegarder par
+    l'appelant une fois les données persistées (None sinon).
     """
-    try:
-        logger.info("Endpoint /meteo/collect appelé")
-        result = run_collection()  # <- on utilise la fonction correcte
-        return result
-    except Exception as e:
-        logger.error(f"Erreur endpoint /meteo/collect : {e}")
-        return {"status": "error", "message": str(e)}
+    start_date = start_date or settings.OPENMETEO_START_DATE
+    end_date = end_date or datetime.now().strftime("%Y-%m-%d")
+    villes = lister_villes(pays_selectionnes)
+
+    if incremental:
+        store = WatermarkStore()
+        if not dataset_existe(settings.RAW_DATASET_DIR):
+            store.reinitialiser(pays_selectionnes)
+        frames, echecs = collecter_incremental(villes, start_date, end_date, store,
+                                               sauvegarder=False, progression=progression)
+        store.mettre_a_jour(frames)
+    else:
+        store = None
+        frames, echecs = collecter_villes(villes, start_date, end_date, progression=progression)
+    if not frames:
+        return pd.DataFrame(), echecs, store
+    return pd.concat(frames, ignore_index=True), echecs, store
+
+
+def collect_data():
+    """Collecte les données et les renvoie sous forme de liste d'enregistrements."""
+    df, _, _ = collecter_dataframe()
+    return df.rename(columns=str.lower).to_dict("records")
+
+
+def run_collection(incremental=True, progression=None):
+    """
+    Lance la collecte et fusionne les nouvelles lignes dans le dataset brut
+    (RAW_DATASET_DIR).
+    """
+    logger.info("🚀 Lancement de la collecte Open-Meteo")
+    df, echecs, marques = collecter_dataframe(incremental=incremental, progression=progression)
+    erreurs = [f"{ville} ({pays}) : {message}" for pays, ville, message in echecs]
+    if df.empty:
+        statut = "success" if not echecs else "error"
+        return {"status": statut, "message": "Aucune nouvelle donnée collectée", "rows_collected": 0,
+                "errors": erreurs}
+
+    ecrire_parquet(df, settings.RAW_DATASET_DIR)
+    logger.info(f"✅ {len(df)} lignes enregistrées dans {settings.RAW_DATASET_DIR}")
+    # Marques avancées seulement une fois les données écrites : un échec d'écriture
+    # laisse ces jours à recollecter
+    if marques:
+        marques.sauvegarder()
+
+    message = f"{len(df)} lignes collectées"
+    if echecs:
+        message += f", {len(echecs)} ville(s) en échec : " + ", ".join(v for _, v, _ in echecs)
+    return {"status": "success", "message": message, "rows_collected": len(df), "errors": erreurs}
@@ -0,0 +1,138 @@
+# app/services/dashboard.py
+"""
+Couche de requêtes du tableau de bord Dash.
+
+Aucun processus ne garde le dataset en mémoire : chaque callback demande une
+série déjà filtrée (une ville, une période) ou déjà agrégée (une ligne par
+ville pour la carte). Les lectures passent par `lire_parquet`, qui n'ouvre que
+les partitions Pays/annee/mois concernées et ne décode que les colonnes
+utiles : le coût d'un callback dépend de la période affichée, pas de la
+profondeur de l'historique, et plusieurs workers Dash partagent les fichiers
+au lieu d'en tenir chacun une copie.
+
+Les résultats (tranches filtrées, agrégats, vues calculées par les callbacks)
+sont mémorisés dans un cache LRU (`CacheLRU`, le même que celui de l'API),
+par sélection et par version du dataset : revoir une sélection ou l'exporter
+ne recalcule rien. La version (nombre de fichiers, dernière modification) est
+relue au plus toutes les DASH_CACHE_VERSION_POLL secondes ; une nouvelle
+écriture du dataset vide le cache. Le cache est propre à chaque processus.
+"""
+import logging
+import sys
+import time
+
+import pandas as pd
+
+from app.core.config import settings
+from app.core.villes import REGISTRE
+from app.services.api_cache import CacheLRU
+from app.services.storage import dataset_existe, lire_parquet, ouvrir_dataset, version_dataset
+
+logger = logging.getLogger(__name__)
+
+# Colonnes du dataset nettoyé -> libellés affichés
+LIBELLES = {
+    'datetime': 'Date',
+    'temp': 'Température (°C)',
+    'precip': 'Précipitations (mm)',
+    'windspeed': 'Vent (km/h)',
+    'winddir': 'Direction Vent (°)',
+    'cloudcover': 'Couverture Nuageuse',
+    'conditions': 'Conditions',
+}
+COLONNES_SERIE = ['datetime', 'Pays', 'Ville', 'latitude', 'longitude', 'temp',
+                  'precip', 'windspeed', 'winddir', 'cloudcover', 'conditions']
+
+
+def taille_objet(valeur):
+    """Taille approximative (octets) d'une valeur mise en cache."""
+    if isinstance(valeur, pd.DataFrame):
+        return int(valeur.memory_usage(deep=True).sum())
+    return sys.getsizeof(valeur)
+
+
+def _jour(valeur):
+    """Borne de période normalisée (clé de cache stable quel que soit le format reçu)."""
+    return None if valeur is None else pd.Timestamp(valeur).normalize()
+
+
+class SourceDashboard:
+    """
+    Requêtes du tableau de bord sur le dataset Parquet nettoyé. Les DataFrames
+    renvoyés peuvent venir du cache : ils ne doivent pas être modifiés sur place.
+    """
+
+    def __init__(self, dossier=None, cache=None):
+        self.dossier = dossier or settings.CLEAN_DATASET_DIR
+        if not dataset_existe(self.dossier):
+            raise FileNotFoundError(f"Le dataset de données n'a pas été trouvé : {self.dossier}")
+        self.cache = cache or CacheLRU(settings.DASH_CACHE_MAX_ENTRIES, settings.DASH_CACHE_MAX_BYTES,
+                                       settings.DASH_CACHE_TTL)
+        self._version = None
+        self._controle = 0.0
+
+    def version(self):
+        """Version du dataset ; vide le cache quand elle change."""
+        maintenant = time.monotonic()
+        if self._version is None or maintenant - self._controle >= settings.DASH_CACHE_VERSION_POLL:
+            self._controle = maintenant
+            version = version_dataset(self.dossier)
+            if version != self._version:
+                if self._version is not None:
+                    logger.info(f"🔄 Dataset {self.dossier} modifié : cache du tableau de bord vidé")
+                self.cache.invalider(version)
+                self._version = version
+        return self._version
+
+    def memoiser(self, nom, cle, calcul, taille=taille_objet):
+        """Résultat de `calcul()` pour (nom, version du dataset, *cle), calculé une seule fois."""
+        cle = (nom, self.version(), *cle)
+        valeur = self.cache.get(cle)
+        if valeur is None:
+            valeur = calcul()
+            self.cache.set(cle, valeur, taille(valeur))
+        return valeur
+
+    def inventaire(self):
+        """
+        Première et dernière date de chaque ville du référentiel présente
+        (id_ville, Pays, Ville, debut, fin), calculées par pyarrow sur trois colonnes.
+        """
+        table = ouvrir_dataset(self.dossier).to_table(columns=['Pays', 'Ville', 'datetime']).unify_dictionaries()
+        bornes = table.group_by(['Pays', 'Ville']).aggregate([('datetime', 'min'), ('datetime', 'max')])
+        df = bornes.to_pandas().astype({'Pays': str, 'Ville': str})
+        df = df.rename(columns={'datetime_min': 'debut', 'datetime_max': 'fin'})
+        df.insert(0, 'id_ville', REGISTRE.identifier(df['Pays'], df['Ville']))
+        return df[df['id_ville'] >= 0].sort_values('id_ville', ignore_index=True)
+
+    def serie(self, id_ville, debut=None, fin=None, colonnes=COLONNES_SERIE):
+        """Observations d'une ville sur [debut, fin], triées par date, avec les libellés affichés."""
+        debut, fin = _jour(debut), _jour(fin)
+        return self.memoiser("serie", (id_ville, debut, fin, tuple(colonnes)),
+                             lambda: self._lire_serie(id_ville, debut, fin, colonnes))
+
+    def _lire_serie(self, id_ville, debut, fin, colonnes):
+        ville = REGISTRE.par_id(id_ville)
+        df = lire_parquet(self.dossier, colonnes=colonnes, pays=ville.pays, villes=ville.ville,
+                          date_debut=debut, date_fin=fin)
+        return df.sort_values('datetime', ignore_index=True).rename(columns=LIBELLES)
+
+    def carte(self, pays, debut=None, fin=None):
+        """
+        Une ligne par ville du pays sur [debut, fin] : température moyenne,
+        précipitations totales et coordonnées du référentiel.
+        """
+        debut, fin = _jour(debut), _jour(fin)
+        return self.memoiser("carte", (pays, debut, fin), lambda: self._agreger_carte(pays, debut, fin))
+
+    def _agreger_carte(self, pays, debut, fin):
+        df = lire_parquet(self.dossier, colonnes=['Ville', 'temp', 'precip'],
+                          pays=pays, date_debut=debut, date_fin=fin)
+        agregats = (df.groupby('Ville', observed=True)
+                      .agg(temp=('temp', 'mean'), precip=('precip', 'sum'))
+                      .reset_index().astype({'Ville': str}))
+        references = pd.DataFrame([v._asdict() for v in REGISTRE.villes_du_pays(pays)],
+                                  columns=['id', 'ville', 'lat', 'lon'])
+        agregats = agregats.merge(references, how='inner', left_on='Ville', right_on='ville')
+        return agregats.rename(columns={'lat': 'latitude', 'lon': 'longitude', **LIBELLES})[
+            ['Ville', 'latitude', 'longitude', 'Température (°C)', 'Précipitations (mm)']]
@@ -0,0 +1,81 @@
+# app/services/decimation.py
+"""
+Réduction des séries temporelles avant affichage.
+
+Un graphique ne montre pas plus de points que sa largeur en pixels : au-delà
+d'un budget de points, la série est réduite côté serveur pour que la taille
+des figures envoyées au navigateur reste bornée, quelle que soit la période.
+
+- LTTB (Largest-Triangle-Three-Buckets) garde la forme des courbes continues
+  (température, vent) ;
+- le découpage min/max garde les extrêmes de chaque intervalle, pour les
+  séries à pics (précipitations).
+"""
+import numpy as np
+
+LTTB, MINMAX = "lttb", "minmax"
+
+
+def _bornes(nb, nb_intervalles):
+    """Limites de `nb_intervalles` intervalles de taille égale sur [0, nb)."""
+    return np.linspace(0, nb, nb_intervalles + 1).astype(np.int64)
+
+
+def lttb(x, y, nb_points):
+    """
+    Indices des `nb_points` points retenus par LTTB (premier et dernier compris).
+    `x` numérique croissant, `y` sans valeurs manquantes.
+    """
+    nb = len(y)
+    if nb_points >= nb or nb_points < 3:
+        return np.arange(nb)
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    bornes = _bornes(nb - 2, nb_points - 2) + 1
+    retenus = np.empty(nb_points, dtype=np.int64)
+    retenus[0], retenus[-1] = 0, nb - 1
+    a = 0
+    for i in range(nb_points - 2):
+        debut, fin = bornes[i], bornes[i + 1]
+        # Sommet C : moyenne de l'intervalle suivant (dernier point pour le dernier intervalle)
+        suivant_debut, suivant_fin = fin, bornes[i + 2] if i + 2 < len(bornes) else nb
+        if suivant_debut >= suivant_fin:
+            cx, cy = x[-1], y[-1]
+        else:
+            cx, cy = x[suivant_debut:suivant_fin].mean(), y[suivant_debut:suivant_fin].mean()
+        aires = np.abs((x[a] - cx) * (y[debut:fin] - y[a]) - (x[a] - x[debut:fin]) * (cy - y[a]))
+        a = debut + int(np.argmax(aires))
+        retenus[i + 1] = a
+    return retenus
+
+
+def minmax(y, nb_points):
+    """Indices du minimum et du maximum de chacun des `nb_points // 2` intervalles, dans l'ordre."""
+    nb = len(y)
+    if nb_points >= nb or nb_points < 2:
+        return np.arange(nb)
+    y = np.asarray(y, dtype="float64")
+    bornes = _bornes(nb, nb_points // 2)
+    retenus = []
+    for debut, fin in zip(bornes[:-1], bornes[1:]):
+        if fin > debut:
+            tranche = y[debut:fin]
+            retenus += [debut + int(np.argmin(tranche)), debut + int(np.argmax(tranche))]
+    return np.unique(retenus)
+
+
+def decimer(df, colonne_x, colonne_y, nb_points, methode=LTTB):
+    """
+    Lignes de `df` (trié sur `colonne_x`) retenues pour tracer `colonne_y` avec
+    au plus `nb_points` points. Les lignes sans valeur sont écartées.
+    """
+    df = df[df[colonne_y].notna()]
+    if len(df) <= nb_points:
+        return df
+    if methode == MINMAX:
+        indices = minmax(df[colonne_y].to_numpy(), nb_points)
+    else:
+        x = df[colonne_x]
+        x = x.to_numpy(dtype="datetime64[ns]").astype("int64") if x.dtype.kind == "M" else x.to_numpy()
+        indices = lttb(x, df[colonne_y].to_numpy(), nb_points)
+    return df.iloc[indices]
@@ -0,0 +1,165 @@
+# app/services/export.py
+"""
+Export en flux du dataset nettoyé (CSV ou Parquet), commun au tableau de bord
+et à l'API.
+
+Les lignes sont lues lot par lot dans le dataset Parquet (partitions élaguées
+par les filtres, colonnes choisies uniquement) et chaque lot est écrit puis
+envoyé aussitôt : la mémoire est bornée par la taille d'un lot et le
+téléchargement commence dès le premier. Le CSV peut être compressé en gzip au
+fil de l'eau ; chaque lot devient un row group du fichier Parquet.
+"""
+import io
+import re
+import unicodedata
+import zlib
+from datetime import date
+from urllib.parse import quote
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pcsv
+import pyarrow.parquet as pq
+
+from app.core.config import settings
+from app.services.storage import iterer_lots, ouvrir_dataset
+
+TYPES_MIME = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+COMPRESSIONS = {
+    "csv": (None, "gzip"),
+    "parquet": (None, "snappy", "zstd", "gzip"),
+}
+COLONNES_TECHNIQUES = ("annee", "mois")
+
+
+class Tampon(io.RawIOBase):
+    """Fichier en écriture seule dont on récupère le contenu au fur et à mesure."""
+
+    def __init__(self):
+        self._morceaux = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, donnees):
+        donnees = bytes(donnees)
+        self._morceaux.append(donnees)
+        self._position += len(donnees)
+        return len(donnees)
+
+    def tell(self):
+        return self._position
+
+    def vider(self):
+        """Octets écrits depuis le dernier appel."""
+        contenu, self._morceaux = b"".join(self._morceaux), []
+        return contenu
+
+
+def valider_export(dossier, format, colonnes=None, compression=None):
+    """
+    Schéma Arrow des colonnes exportées (toutes par défaut, dans l'ordre du
+    dataset) après contrôle du format, de la compression et des noms de
+    colonnes. Lève ValueError pour une demande invalide.
+    """
+    if format not in TYPES_MIME:
+        raise ValueError(f"Format inconnu : {format} (formats : {', '.join(TYPES_MIME)})")
+    if compression not in COMPRESSIONS[format]:
+        permises = ", ".join(c for c in COMPRESSIONS[format] if c)
+        raise ValueError(f"Compression {compression} impossible en {format} (possibles : {permises})")
+    schema = ouvrir_dataset(dossier).schema
+    disponibles = [c for c in schema.names if c not in COLONNES_TECHNIQUES]
+    inconnues = [c for c in colonnes or [] if c not in disponibles]
+    if inconnues:
+        raise ValueError(f"Colonnes inconnues : {', '.join(inconnues)}")
+    return pa.schema([schema.field(c) for c in colonnes or disponibles])
+
+
+def regrouper(lots, taille_lot):
+    """
+    Tables d'environ `taille_lot` lignes : les petits lots (un par fichier de
+    partition) sont regroupés pour limiter le coût fixe de chaque écriture.
+    """
+    tampon, lignes = [], 0
+    for lot in lots:
+        tampon.append(lot)
+        lignes += lot.num_rows
+        if lignes >= taille_lot:
+            yield pa.Table.from_batches(tampon)
+            tampon, lignes = [], 0
+    if tampon:
+        yield pa.Table.from_batches(tampon)
+
+
+def _dates_lisibles(table):
+    """Horodatages écrits comme des dates si la table ne contient que des minuits (données journalières)."""
+    colonnes = []
+    for champ, colonne in zip(table.schema, table.columns):
+        if pa.types.is_timestamp(champ.type) and len(colonne):
+            jours = pc.cast(pc.cast(colonne, pa.date32()), champ.type)
+            if pc.all(pc.equal(jours, colonne)).as_py():
+                colonne = pc.cast(colonne, pa.date32())
+            else:
+                colonne = pc.strftime(colonne, format="%Y-%m-%dT%H:%M:%S")
+        colonnes.append(colonne)
+    return pa.Table.from_arrays(colonnes, names=table.schema.names)
+
+
+def flux_csv(tables, schema, compression=None):
+    """CSV (UTF-8, en-tête d'abord) produit table par table, gzip optionnel."""
+    gzip = zlib.compressobj(6, zlib.DEFLATED, 31) if compression == "gzip" else None
+
+    def envoyer(morceau):
+        return gzip.compress(morceau) + gzip.flush(zlib.Z_SYNC_FLUSH) if gzip else morceau
+
+    yield envoyer((",".join(f'"{nom}"' for nom in schema.names) + "\n").encode("utf-8"))
+    tampon = Tampon()
+    options = pcsv.WriteOptions(include_header=False)
+    for table in tables:
+        pcsv.write_csv(_dates_lisibles(table), tampon, options)
+        yield envoyer(tampon.vider())
+    if gzip:
+        yield gzip.flush()
+
+
+def flux_parquet(tables, schema, compression="snappy"):
+    """Fichier Parquet produit table par table (un row group par table, pied de page à la fin)."""
+    tampon = Tampon()
+    ecrivain = pq.ParquetWriter(tampon, schema, compression=compression or "none")
+    yield tampon.vider()
+    for table in tables:
+        ecrivain.write_table(table, row_group_size=table.num_rows)
+        yield tampon.vider()
+    ecrivain.close()
+    yield tampon.vider()
+
+
+def nom_fichier(format, compression=None, prefixe="meteo_uemoa"):
+    extension = "csv.gz" if (format, compression) == ("csv", "gzip") else format
+    return f"{prefixe}_{date.today():%Y%m%d}.{extension}"
+
+
+def disposition_piece_jointe(nom):
+    """
+    En-tête Content-Disposition d'un téléchargement : nom ASCII de repli (les
+    en-têtes HTTP sont encodés en latin-1) et nom UTF-8 complet (RFC 5987).
+    """
+    repli = unicodedata.normalize("NFKD", nom).encode("ascii", "ignore").decode()
+    repli = re.sub(r"[^A-Za-z0-9._-]+", "_", repli)
+    return f"attachment; filename=\"{repli}\"; filename*=UTF-8''{quote(nom)}"
+
+
+def exporter(format="csv", colonnes=None, compression=None, dossier=None, taille_lot=None, **filtres):
+    """
+    Flux d'octets de l'export et son type MIME. Filtres : pays, villes,
+    date_debut, date_fin (comme `lire_parquet`). Lève ValueError pour une
+    demande invalide, avant tout envoi.
+    """
+    dossier = dossier or settings.CLEAN_DATASET_DIR
+    schema = valider_export(dossier, format, colonnes, compression)
+    taille_lot = taille_lot or settings.EXPORT_TAILLE_LOT
+    tables = regrouper(iterer_lots(dossier, taille_lot, schema.names, **filtres), taille_lot)
+    flux = flux_csv(tables, schema, compression) if format == "csv" else flux_parquet(tables, schema, compression)
+    type_mime = "application/gzip" if compression == "gzip" and format == "csv" else TYPES_MIME[format]
+    return flux, type_mime
@@ -0,0 +1,125 @@
+# app/services/jobs.py
+"""
+Exécution en arrière-plan du pipeline collecte → nettoyage → chargement.
+
+Un seul thread de travail dans le processus de l'API (aucun broker) : une
+requête enregistre un job et rend la main immédiatement, l'avancement se lit
+ensuite par son identifiant. Tant qu'un job est en attente ou en cours, une
+nouvelle demande renvoie ce job au lieu d'en lancer un second.
+"""
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from app.core.villes import lister_villes
+from app.utils.logger import logger
+
+EN_ATTENTE, EN_COURS, TERMINE, ECHEC = "en_attente", "en_cours", "termine", "echec"
+HISTORIQUE_MAX = 50
+
+
+class Job:
+    """État d'une exécution du pipeline, mis à jour par le thread de travail."""
+
+    def __init__(self, incremental=True):
+        self.id = uuid.uuid4().hex
+        self.statut = EN_ATTENTE
+        self.etape = None
+        self.incremental = incremental
+        self.cree_le = datetime.now()
+        self.debut = None
+        self.fin = None
+        self.villes_total = len(lister_villes())
+        self.villes_traitees = 0
+        self.lignes_collectees = 0
+        self.lignes_nettoyees = 0
+        self.lignes_chargees = 0
+        self.erreurs = []
+        self.message = None
+
+    @property
+    def actif(self):
+        return self.statut in (EN_ATTENTE, EN_COURS)
+
+    def progression(self, nb_villes):
+        self.villes_traitees = min(self.villes_total, self.villes_traitees + nb_villes)
+
+    def etat(self):
+        return dict(vars(self))
+
+
+class GestionnaireJobs:
+    """File de jobs traitée par un thread unique, avec historique borné."""
+
+    def __init__(self, historique_max=HISTORIQUE_MAX):
+        self._jobs = OrderedDict()
+        self._verrou = threading.Lock()
+        self._executeur = None
+        self.historique_max = historique_max
+
+    def soumettre(self, incremental=True):
+        """
+        Enregistre un job et le confie au thread de travail.
+        Retourne (job, nouveau) : nouveau vaut False si un job actif a été réutilisé.
+        """
+        with self._verrou:
+            actif = next((j for j in self._jobs.values() if j.actif), None)
+            if actif:
+                return actif, False
+            job = Job(incremental)
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.historique_max:
+                self._jobs.popitem(last=False)
+            if self._executeur is None:
+                self._executeur = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pipeline")
+            self._executeur.submit(executer_job, job)
+        logger.info(f"📥 Job {job.id} en file (incrémental={incremental})")
+        return job, True
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def lister(self):
+        """Jobs du plus récent au plus ancien."""
+        return list(reversed(self._jobs.values()))
+
+    def arreter(self):
+        """Abandonne les jobs en attente (le job en cours se termine sans être attendu)."""
+        if self._executeur is not None:
+            self._executeur.shutdown(wait=False, cancel_futures=True)
+            self._executeur = None
+
+
+def executer_job(job):
+    """Pipeline en mémoire (collecte, nettoyage, chargement) ; datasets Parquet mis à jour pour le tableau de bord."""
+    # Import différé : pandas/pyarrow/psycopg2 ne sont chargés qu'au premier job
+    from app.services.pipeline import executer_pipeline
+
+    job.statut, job.debut = EN_COURS, datetime.now()
+    try:
+        resultat = executer_pipeline(
+            incremental=job.incremental, checkpoint=True,
+            progression=job.progression, sur_etape=lambda etape: setattr(job, "etape", etape),
+        )
+        job.lignes_collectees = resultat["lignes_collectees"]
+        job.lignes_nettoyees = resultat["lignes_nettoyees"]
+        job.lignes_chargees = resultat["lignes_chargees"]
+        job.erreurs += [f"{ville} ({pays}) : {message}" for pays, ville, message in resultat["echecs"]]
+        if resultat["echecs"] and not job.lignes_collectees:
+            raise RuntimeError(f"{len(resultat['echecs'])} ville(s) en échec, aucune donnée collectée")
+        job.statut = TERMINE
+        job.message = (f"{job.lignes_collectees} lignes collectées, {job.lignes_chargees} faits chargés"
+                       + (f", {len(resultat['echecs'])} ville(s) en échec" if resultat["echecs"] else ""))
+        logger.info(f"✅ Job {job.id} terminé : {job.message}")
+    except Exception as e:
+        job.statut = ECHEC
+        job.erreurs.append(f"{job.etape} : {e}")
+        job.message = f"Échec à l'étape {job.etape}"
+        logger.error(f"❌ Job {job.id} en échec ({job.etape}) : {e}")
+    finally:
+        job.fin = datetime.now()
+
+
+gestionnaire_jobs = GestionnaireJobs()
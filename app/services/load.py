@@ -1,9 +1,16 @@
+import numpy as np
 import pandas as pd
 import psycopg2
-from psycopg2.extras import execute_batch
+from psycopg2.extras import execute_batch, execute_values
 from datetime import datetime, timedelta
+import io
 import logging
 
+from app.core.config import settings
+from app.core.villes import REGISTRE
+from app.services.rollups import rafraichir_agregats
+from app.services.storage import lire_parquet
+
 # === Configuration de la base de données ===
 DB_CONFIG = {
     'dbname': 'entrepot_uemoa',
@@ -13,15 +20,69 @@ DB_CONFIG = {
     'port': '5432'
 }
 
-# === Fichier d'entrée ===
-INPUT_CSV = "/Users/NOKHO/Desktop/Meteo/historique_meteo_uemoa_80villes_clean.csv"
+# === Dataset d'entrée (Parquet partitionné) ===
+INPUT_DATASET = settings.CLEAN_DATASET_DIR
+
+# === Colonnes de la table de faits ===
+MESURES = [
+    'temp', 'tempmax', 'tempmin', 'feelslike', 'feelslikemax', 'feelslikemin',
+    'dew', 'precip', 'precipcover', 'windgust', 'windspeed', 'winddir',
+    'cloudcover', 'solarradiation', 'solarenergy', 'uvindex'
+]
+COLONNES_FAITS = ['datecollect', 'id_dim_lieu', 'id_dim_condition'] + MESURES
+COLONNES_ENTREE = ['datetime', 'Ville', 'Pays', 'latitude', 'longitude', 'conditions'] + MESURES
+
+# === Chargement en masse : COPY vers une table de staging non journalisée, puis fusion ===
+METHODE_CHARGEMENT = "copy"   # "copy" ou "execute_batch" (ancienne méthode, ligne à ligne)
+TABLE_STAGING = "staging_faits_meteo"
+TAILLE_BLOC_COPY = 100_000
+
+SQL_CREATION_STAGING = f"""
+    CREATE UNLOGGED TABLE IF NOT EXISTS {TABLE_STAGING} (
+        datecollect DATE NOT NULL,
+        id_dim_lieu INTEGER NOT NULL,
+        id_dim_condition INTEGER NOT NULL,
+        {", ".join(f"{col} DOUBLE PRECISION" for col in MESURES)}
+    )
+"""
+
+# Index de lecture de l'API : observations d'un lieu sur une plage de dates
+SQL_INDEX_FAITS = """
+    CREATE INDEX IF NOT EXISTS idx_faits_meteo_lieu_date
+    ON faits_meteo (id_dim_lieu, datecollect)
+"""
+
+# Compteur et date des chargements, lus par l'API (cache de réponses, ETag / Last-Modified)
+SQL_GENERATION = """
+    CREATE TABLE IF NOT EXISTS meta_entrepot (cle TEXT PRIMARY KEY, valeur BIGINT NOT NULL);
+    INSERT INTO meta_entrepot (cle, valeur) VALUES ('charge_le', extract(epoch FROM now())::bigint)
+    ON CONFLICT (cle) DO UPDATE SET valeur = EXCLUDED.valeur;
+    INSERT INTO meta_entrepot (cle, valeur) VALUES ('generation', 1)
+    ON CONFLICT (cle) DO UPDATE SET valeur = meta_entrepot.valeur + 1
+    RETURNING valeur
+"""
+
+# `WHERE true` lève l'ambiguïté INSERT ... SELECT ... ON CONFLICT côté SQLite ;
+# la même requête sert ainsi sur PostgreSQL et sur une base SQLite de test.
+SQL_FUSION_FAITS = f"""
+    INSERT INTO faits_meteo ({", ".join(COLONNES_FAITS)})
+    SELECT {", ".join(COLONNES_FAITS)} FROM {TABLE_STAGING} WHERE true
+    ON CONFLICT (datecollect, id_dim_lieu) DO UPDATE SET
+        {", ".join(f"{col} = EXCLUDED.{col}" for col in ['id_dim_condition'] + MESURES)}
+"""
 
 # === Configuration du logging ===
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 def safe_float(value):
-    """Convertit une valeur en float ou retourne None si invalide"""
+    """
+    Convertit une valeur en float ou retourne None si invalide. Les flottants numpy
+    passent par leur représentation décimale la plus courte : np.float32(28.3) donne
+    28.3 et non 28.299999237060547 (comme l'écriture CSV du chemin COPY)
+    """
+    if isinstance(value, np.floating):
+        value = str(value)
     try:
         return float(value)
     except (TypeError, ValueError):
@@ -66,158 +127,258 @@ def initialiser_dim_date(conn):
         logger.error(f"❌ Erreur initialisation dim_date : {e}", exc_info=True)
         raise
 
-def charger_donnees():
-    """Charge les données nettoyées dans le schéma en étoile"""
+def codes_distincts(df, colonnes, autres=()):
+    """
+    Code entier de chaque ligne pour la combinaison `colonnes`, et DataFrame des
+    combinaisons distinctes (une ligne par code, dans l'ordre des codes, avec les
+    colonnes `autres` de leur première occurrence)
+    """
+    codes = df.groupby(colonnes, observed=True, sort=False, dropna=False).ngroup().to_numpy()
+    _, premieres = np.unique(codes, return_index=True)
+    distincts = df[colonnes + list(autres)].iloc[premieres].reset_index(drop=True)
+    return codes, distincts.astype({col: object for col in colonnes})
+
+def resoudre_cles(df, colonnes, dimension, id_col):
+    """
+    Clé de substitution de chaque ligne : jointure des combinaisons distinctes de
+    `colonnes` avec la dimension (petit DataFrame), puis diffusion par les codes.
+    Le coût par ligne se limite à des opérations sur des entiers.
+    """
+    codes, distincts = codes_distincts(df, colonnes)
+    distincts = distincts.astype(str).where(distincts.notna(), None)
+    ids = distincts.merge(dimension, how='left', on=colonnes)[id_col].to_numpy(dtype='float64')
+    return pd.array(ids[codes], dtype='Int64')
+
+def resoudre_lieux(df, dim_lieu):
+    """
+    id_dim_lieu de chaque ligne via l'identifiant du référentiel des villes :
+    une table id_ville -> id_dim_lieu indexée par entiers. Seules les villes
+    hors référentiel repassent par la jointure sur (Ville, Pays).
+    """
+    ids_ville = REGISTRE.identifier(df['Pays'], df['Ville'])
+    table = np.full(int(REGISTRE.ids.max()) + 1, np.nan)
+    connus = REGISTRE.identifier(dim_lieu['Pays'], dim_lieu['Ville'])
+    table[connus[connus >= 0]] = dim_lieu['id_dim_lieu'].to_numpy(dtype='float64')[connus >= 0]
+    ids = table[np.maximum(ids_ville, 0)]
+    hors_registre = ids_ville < 0
+    if hors_registre.any():
+        ids[hors_registre] = resoudre_cles(df[hors_registre], ['Ville', 'Pays'], dim_lieu, 'id_dim_lieu').to_numpy(
+            dtype='float64', na_value=np.nan)
+    return pd.array(ids, dtype='Int64')
+
+def preparer_faits(df, dim_lieu, dim_conditions):
+    """
+    Construit le DataFrame de faits_meteo : clés de dimensions résolues en bloc,
+    lignes sans lieu ou sans condition connus écartées
+    """
+    faits = pd.DataFrame({
+        'datecollect': pd.to_datetime(df['datetime']).dt.normalize().to_numpy(),
+        'id_dim_lieu': resoudre_lieux(df, dim_lieu),
+        'id_dim_condition': resoudre_cles(df, ['conditions'], dim_conditions, 'id_dim_condition'),
+    })
+    for col in MESURES:
+        faits[col] = pd.to_numeric(df[col], errors='coerce').to_numpy() if col in df.columns else np.nan
+    return faits[faits['id_dim_lieu'].notna() & faits['id_dim_condition'].notna()].reset_index(drop=True)
+
+def charger_faits_execute_batch(conn, df_faits):
+    """Ancienne méthode : upsert ligne à ligne via execute_batch"""
+    data_faits = [
+        (row[0].date(), int(row[1]), int(row[2]), *(safe_float(v) for v in row[3:]))
+        for row in df_faits[COLONNES_FAITS].itertuples(index=False, name=None)
+    ]
+    with conn.cursor() as cursor:
+        execute_batch(cursor, f"""
+            INSERT INTO faits_meteo ({", ".join(COLONNES_FAITS)})
+            VALUES ({", ".join(["%s"] * len(COLONNES_FAITS))})
+            ON CONFLICT (datecollect, id_dim_lieu) DO UPDATE SET
+                {", ".join(f"{col} = EXCLUDED.{col}" for col in ['id_dim_condition'] + MESURES)}
+        """, data_faits, page_size=1000)
+    return len(data_faits)
+
+def lire_dimension(conn, requete, colonnes):
+    """Charge une table de dimension (petite) dans un DataFrame"""
+    with conn.cursor() as cursor:
+        cursor.execute(requete)
+        return pd.DataFrame(cursor.fetchall(), columns=colonnes)
+
+def synchroniser_dim_lieu(conn, df):
+    """Insère en un seul INSERT multi-lignes les lieux absents, retourne dim_lieu"""
+    requete = "SELECT id_dim_lieu, ville, pays FROM dim_lieu"
+    colonnes = ['id_dim_lieu', 'Ville', 'Pays']
+    existants = lire_dimension(conn, requete, colonnes)
+
+    _, lieux = codes_distincts(df, ['Ville', 'Pays'], autres=['latitude', 'longitude'])
+    lieux = lieux.astype({'Ville': str, 'Pays': str})
+    # Coordonnées de référence pour les villes du référentiel
+    ids_ville = REGISTRE.identifier(lieux['Pays'], lieux['Ville'])
+    connus = ids_ville >= 0
+    positions = np.searchsorted(REGISTRE.ids, ids_ville[connus])
+    lieux.loc[connus, 'latitude'] = REGISTRE.latitudes[positions]
+    lieux.loc[connus, 'longitude'] = REGISTRE.longitudes[positions]
+
+    nouveaux = lieux.merge(existants, how='left', on=['Ville', 'Pays'], indicator=True)
+    nouveaux = nouveaux[nouveaux['_merge'] == 'left_only']
+    if nouveaux.empty:
+        logger.info("✅ Aucun nouveau lieu à insérer")
+        return existants
+
+    with conn.cursor() as cursor:
+        execute_values(cursor, """
+            INSERT INTO dim_lieu (ville, pays, latitude, longitude)
+            VALUES %s
+            ON CONFLICT (ville, pays) DO UPDATE SET
+                latitude = EXCLUDED.latitude,
+                longitude = EXCLUDED.longitude
+        """, [
+            (v, p, safe_float(lat), safe_float(lon))
+            for v, p, lat, lon in nouveaux[['Ville', 'Pays', 'latitude', 'longitude']].itertuples(index=False)
+        ])
+    logger.info(f"✅ {len(nouveaux)} nouveaux lieux insérés/mis à jour")
+    return lire_dimension(conn, requete, colonnes)
+
+def synchroniser_dim_conditions(conn, df):
+    """Insère en un seul INSERT multi-lignes les conditions absentes, retourne dim_conditions"""
+    requete = "SELECT id_dim_condition, conditions FROM dim_conditions"
+    colonnes = ['id_dim_condition', 'conditions']
+    existantes = lire_dimension(conn, requete, colonnes)
+
+    _, conditions = codes_distincts(df, ['conditions'])
+    conditions = conditions.dropna().astype(str)
+    nouvelles = conditions[~conditions['conditions'].isin(existantes['conditions'])]
+    if nouvelles.empty:
+        logger.info("✅ Aucune nouvelle condition à insérer")
+        return existantes
+
+    with conn.cursor() as cursor:
+        execute_values(cursor, """
+            INSERT INTO dim_conditions (conditions)
+            VALUES %s
+            ON CONFLICT (conditions) DO NOTHING
+        """, list(nouvelles.itertuples(index=False, name=None)))
+    logger.info(f"✅ {len(nouvelles)} nouvelles conditions insérées")
+    return lire_dimension(conn, requete, colonnes)
+
+class FluxCSV(io.RawIOBase):
+    """Fichier en lecture seule qui produit le CSV d'un DataFrame bloc par bloc (pour COPY)"""
+
+    def __init__(self, df, taille_bloc=TAILLE_BLOC_COPY):
+        self._blocs = (
+            df.iloc[i:i + taille_bloc].to_csv(index=False, header=False, na_rep='').encode('utf-8')
+            for i in range(0, len(df), taille_bloc)
+        )
+        self._tampon = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._tampon:
+            try:
+                self._tampon = next(self._blocs)
+            except StopIteration:
+                return 0
+        n = min(len(buffer), len(self._tampon))
+        buffer[:n] = self._tampon[:n]
+        self._tampon = self._tampon[n:]
+        return n
+
+def copier_vers_staging(conn, df_faits):
+    """Vide la table de staging puis y copie les faits via COPY ... FROM STDIN (CSV)"""
+    with conn.cursor() as cursor:
+        cursor.execute(SQL_CREATION_STAGING)
+        cursor.execute(f"TRUNCATE {TABLE_STAGING}")
+        cursor.copy_expert(
+            f"COPY {TABLE_STAGING} ({', '.join(COLONNES_FAITS)}) FROM STDIN WITH (FORMAT csv)",
+            io.BufferedReader(FluxCSV(df_faits[COLONNES_FAITS]), buffer_size=1 << 20),
+        )
+
+def fusionner_staging(conn):
+    """Fusionne la table de staging dans faits_meteo en une seule requête ensembliste"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(SQL_FUSION_FAITS)
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+def charger_faits_copy(conn, df_faits):
+    """Chargement en masse : COPY vers la staging puis INSERT ... SELECT ... ON CONFLICT"""
+    # Une même clé ne peut être mise à jour deux fois par un seul ON CONFLICT
+    df_faits = df_faits.drop_duplicates(subset=['datecollect', 'id_dim_lieu'], keep='last')
+    copier_vers_staging(conn, df_faits)
+    fusionner_staging(conn)
+    return len(df_faits)
+
+def incrementer_generation(conn):
+    """Signale un nouveau chargement de l'entrepôt (cache de l'API à invalider)"""
+    with conn.cursor() as cursor:
+        cursor.execute(SQL_GENERATION)
+        return cursor.fetchone()[0]
+
+def charger_dataframe(conn, df, methode=METHODE_CHARGEMENT):
+    """
+    Charge un DataFrame nettoyé (colonnes COLONNES_ENTREE) dans le schéma en étoile :
+    dimensions, faits, index, agrégats et génération. Retourne le nombre de faits chargés
+    """
+    # Initialiser dim_date
+    initialiser_dim_date(conn)
+
+    # Remplissage de dim_lieu avec gestion des doublons
+    logger.info("🌍 Chargement des lieux dans dim_lieu...")
+    dim_lieu = synchroniser_dim_lieu(conn, df)
+    conn.commit()
+
+    # Remplissage de dim_conditions avec gestion des doublons
+    logger.info("⛅ Chargement des conditions météo dans dim_conditions...")
+    dim_conditions = synchroniser_dim_conditions(conn, df)
+    conn.commit()
+
+    # Remplissage de faits_meteo avec upsert
+    logger.info("📈 Insertion des données dans faits_meteo...")
+    df_faits = preparer_faits(df, dim_lieu, dim_conditions)
+    nb_faits = 0
+    if not df_faits.empty:
+        if methode == "copy":
+            nb_faits = charger_faits_copy(conn, df_faits)
+        else:
+            nb_faits = charger_faits_execute_batch(conn, df_faits)
+        logger.info(f"✅ {nb_faits} observations insérées/mises à jour dans faits_meteo ({methode})")
+    else:
+        logger.info("✅ Aucune nouvelle observation à insérer")
+    with conn.cursor() as cursor:
+        cursor.execute(SQL_INDEX_FAITS)
+
+    # Agrégats de l'API de statistiques : seules les périodes chargées sont recalculées.
+    # Faits, agrégats et génération sont validés ensemble : un échec du rafraîchissement
+    # annule aussi la fusion des faits, rejouée en entier au prochain chargement
+    if not df_faits.empty:
+        dates = pd.to_datetime(df_faits['datecollect'])
+        rafraichir_agregats(conn, dates.min().date(), dates.max().date())
+
+    generation = incrementer_generation(conn)
+    conn.commit()
+    logger.info(f"🔄 Génération de l'entrepôt : {generation}")
+    return nb_faits
+
+def charger_donnees(methode=METHODE_CHARGEMENT, df=None):
+    """
+    Charge les données nettoyées dans le schéma en étoile ; retourne le nombre de faits chargés.
+    Sans `df`, lit le dataset nettoyé (INPUT_DATASET) ; sinon charge `df` tel quel (pipeline en mémoire)
+    """
     conn = None
     try:
         logger.info("🔗 Connexion à PostgreSQL...")
         conn = psycopg2.connect(**DB_CONFIG)
 
-        # Initialiser dim_date
-        initialiser_dim_date(conn)
-
-        # Charger le CSV nettoyé
-        logger.info(f"📂 Chargement du fichier {INPUT_CSV}...")
-        df = pd.read_csv(INPUT_CSV)
-        df['datetime'] = pd.to_datetime(df['datetime'])
-        logger.info(f"✅ {len(df)} lignes chargées depuis le fichier")
-
-        # Remplissage de dim_lieu avec gestion des doublons
-        logger.info("🌍 Chargement des lieux dans dim_lieu...")
-        with conn.cursor() as cursor:
-            # Vérification des lieux existants
-            cursor.execute("SELECT ville, pays FROM dim_lieu")
-            lieux_existants = set((ville, pays) for (ville, pays) in cursor.fetchall())
-            
-            lieux_uniques = df[['Ville', 'Pays', 'latitude', 'longitude']].drop_duplicates()
-            nouveaux_lieux = []
-            
-            for _, row in lieux_uniques.iterrows():
-                ville = str(row['Ville'])
-                pays = str(row['Pays'])
-                
-                if (ville, pays) not in lieux_existants:
-                    nouveaux_lieux.append((
-                        ville,
-                        pays,
-                        safe_float(row['latitude']),
-                        safe_float(row['longitude'])
-                    ))
-            
-            if nouveaux_lieux:
-                execute_batch(cursor, """
-                    INSERT INTO dim_lieu (ville, pays, latitude, longitude)
-                    VALUES (%s, %s, %s, %s)
-                    ON CONFLICT (ville, pays) DO UPDATE SET
-                        latitude = EXCLUDED.latitude,
-                        longitude = EXCLUDED.longitude
-                """, nouveaux_lieux)
-                logger.info(f"✅ {len(nouveaux_lieux)} nouveaux lieux insérés/mis à jour")
-            else:
-                logger.info("✅ Aucun nouveau lieu à insérer")
-            conn.commit()
-
-        # Remplissage de dim_conditions avec gestion des doublons
-        logger.info("⛅ Chargement des conditions météo dans dim_conditions...")
-        with conn.cursor() as cursor:
-            # Vérification des conditions existantes
-            cursor.execute("SELECT conditions FROM dim_conditions")
-            conditions_existantes = set(condition for (condition,) in cursor.fetchall())
-            
-            conditions_uniques = df['conditions'].dropna().unique()
-            nouvelles_conditions = []
-            
-            for condition in conditions_uniques:
-                condition_str = str(condition)
-                if condition_str not in conditions_existantes:
-                    nouvelles_conditions.append((condition_str,))
-            
-            if nouvelles_conditions:
-                execute_batch(cursor, """
-                    INSERT INTO dim_conditions (conditions)
-                    VALUES (%s)
-                    ON CONFLICT (conditions) DO NOTHING
-                """, nouvelles_conditions)
-                logger.info(f"✅ {len(nouvelles_conditions)} nouvelles conditions insérées")
-            else:
-                logger.info("✅ Aucune nouvelle condition à insérer")
-            conn.commit()
-
-        # Remplissage de faits_meteo avec upsert
-        logger.info("📈 Insertion des données dans faits_meteo...")
-        with conn.cursor() as cursor:
-            # Récupérer les mappings
-            cursor.execute("SELECT id_dim_lieu, ville, pays FROM dim_lieu")
-            lieux_map = {(ville, pays): id_lieu for (id_lieu, ville, pays) in cursor.fetchall()}
-
-            cursor.execute("SELECT id_dim_condition, conditions FROM dim_conditions")
-            conditions_map = {condition: id_cond for (id_cond, condition) in cursor.fetchall()}
-
-            # Préparer les données
-            data_faits = []
-            for _, row in df.iterrows():
-                id_lieu = lieux_map.get((str(row['Ville']), str(row['Pays'])))
-                id_condition = conditions_map.get(str(row['conditions'])) if pd.notna(row['conditions']) else None
-
-                if id_lieu and id_condition:
-                    data_faits.append((
-                        row['datetime'].date(),
-                        id_lieu,
-                        id_condition,
-                        safe_float(row.get('temp')),
-                        safe_float(row.get('tempmax')),
-                        safe_float(row.get('tempmin')),
-                        safe_float(row.get('feelslike')),
-                        safe_float(row.get('feelslikemax')),
-                        safe_float(row.get('feelslikemin')),
-                        safe_float(row.get('dew')),
-                        safe_float(row.get('precip')),
-                        safe_float(row.get('precipcover')),
-                        safe_float(row.get('windgust')),
-                        safe_float(row.get('windspeed')),
-                        safe_float(row.get('winddir')),
-                        safe_float(row.get('cloudcover')),
-                        safe_float(row.get('solarradiation')),
-                        safe_float(row.get('solarenergy')),
-                        safe_float(row.get('uvindex'))
-                    ))
-
-            if data_faits:
-                execute_batch(cursor, """
-                    INSERT INTO faits_meteo (
-                        datecollect, id_dim_lieu, id_dim_condition, temp, tempmax, tempmin,
-                        feelslike, feelslikemax, feelslikemin, dew, precip,
-                        precipcover, windgust, windspeed, winddir, cloudcover,
-                        solarradiation, solarenergy, uvindex
-                    ) VALUES (
-                        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                        %s, %s, %s, %s, %s, %s, %s, %s
-                    )
-                    ON CONFLICT (datecollect, id_dim_lieu) DO UPDATE SET
-                        id_dim_condition = EXCLUDED.id_dim_condition,
-                        temp = EXCLUDED.temp,
-                        tempmax = EXCLUDED.tempmax,
-                        tempmin = EXCLUDED.tempmin,
-                        feelslike = EXCLUDED.feelslike,
-                        feelslikemax = EXCLUDED.feelslikemax,
-                        feelslikemin = EXCLUDED.feelslikemin,
-                        dew = EXCLUDED.dew,
-                        precip = EXCLUDED.precip,
-                        precipcover = EXCLUDED.precipcover,
-                        windgust = EXCLUDED.windgust,
-                        windspeed = EXCLUDED.windspeed,
-                        winddir = EXCLUDED.winddir,
-                        cloudcover = EXCLUDED.cloudcover,
-                        solarradiation = EXCLUDED.solarradiation,
-                        solarenergy = EXCLUDED.solarenergy,
-                        uvindex = EXCLUDED.uvindex
-                """, data_faits, page_size=1000)
-                logger.info(f"✅ {len(data_faits)} observations insérées/mises à jour dans faits_meteo")
-            else:
-                logger.info("✅ Aucune nouvelle observation à insérer")
-            conn.commit()
+        if df is None:
+            # Charger le dataset nettoyé (colonnes utiles uniquement, dates déjà typées)
+            logger.info(f"📂 Chargement du dataset {INPUT_DATASET}...")
+            df = lire_parquet(INPUT_DATASET, colonnes=COLONNES_ENTREE)
+            logger.info(f"✅ {len(df)} lignes chargées depuis le dataset")
 
+        nb_faits = charger_dataframe(conn, df, methode)
         logger.info("🎉 Chargement des données terminé avec succès.")
+        return nb_faits
 
     except Exception as e:
         if conn:
@@ -0,0 +1,277 @@
+# app/services/openmeteo.py
+"""
+Moteur de collecte asynchrone pour l'API archive d'Open-Meteo.
+
+Les villes sont regroupées en lots de coordonnées (une requête par lot) et
+téléchargées en parallèle (httpx.AsyncClient) sous une limite
+de concurrence, un seau de jetons partagé régule le débit et se vide sur les
+réponses 429, et les échecs transitoires sont relancés avec un backoff
+exponentiel à gigue. Les réponses 200 sont conservées dans un cache disque
+(voir response_cache.py) pour que les relances et reprises évitent le réseau.
+"""
+import asyncio
+import logging
+import random
+import time
+
+import httpx
+import pandas as pd
+
+from app.core.config import settings
+from app.services.response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+# === Variables journalières demandées et renommage vers le schéma du projet ===
+DAILY_VARIABLES = [
+    "temperature_2m_max", "temperature_2m_min", "temperature_2m_mean",
+    "apparent_temperature_max", "apparent_temperature_min", "apparent_temperature_mean",
+    "dew_point_2m_mean", "precipitation_sum", "precipitation_hours",
+    "wind_gusts_10m_max", "wind_speed_10m_max", "wind_direction_10m_dominant",
+    "sunshine_duration", "shortwave_radiation_sum", "et0_fao_evapotranspiration",
+    "weathercode"
+]
+
+COLUMN_MAPPING = {
+    "temperature_2m_max": "tempmax",
+    "temperature_2m_min": "tempmin",
+    "temperature_2m_mean": "temp",
+    "apparent_temperature_max": "feelslikemax",
+    "apparent_temperature_min": "feelslikemin",
+    "apparent_temperature_mean": "feelslike",
+    "dew_point_2m_mean": "dew",
+    "precipitation_sum": "precip",
+    "precipitation_hours": "precipcover",
+    "wind_gusts_10m_max": "windgust",
+    "wind_speed_10m_max": "windspeed",
+    "wind_direction_10m_dominant": "winddir",
+    "sunshine_duration": "solarradiation",
+    "shortwave_radiation_sum": "solarenergy",
+    "et0_fao_evapotranspiration": "uvindex",
+    "weathercode": "conditions"
+}
+
+TIMEZONE = "Africa/Abidjan"
+
+
+class TokenBucket:
+    """Limiteur de débit à seau de jetons, partagé par toutes les requêtes."""
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._pause_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now):
+        elapsed = max(0.0, now - self._last)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._last = max(self._last, now)
+
+    async def acquire(self):
+        """Attend qu'un jeton soit disponible puis le consomme."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._pause_until:
+                    await asyncio.sleep(self._pause_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def penalize(self, delay):
+        """Vide le seau et suspend tous les envois pendant `delay` secondes (429)."""
+        reprise = time.monotonic() + delay
+        self._tokens = 0.0
+        self._pause_until = max(self._pause_until, reprise)
+        self._last = max(self._last, self._pause_until)
+
+
+def _delai_backoff(tentative, base):
+    """Backoff exponentiel avec gigue complète : uniforme sur [0, base * 2^tentative]."""
+    return random.uniform(0, base * (2 ** tentative))
+
+
+def _retry_after(response):
+    """Lit l'en-tête Retry-After (en secondes) d'une réponse 429, si présent."""
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _coordonnees(valeur):
+    """Une coordonnée ou une liste de coordonnées séparées par des virgules."""
+    if isinstance(valeur, (list, tuple)):
+        return ",".join(str(v) for v in valeur)
+    return valeur
+
+
+def construire_params(start_date, end_date, lat, lon):
+    """
+    Paramètres de requête de l'endpoint archive. `lat`/`lon` peuvent être des
+    listes : l'API renvoie alors une réponse par coordonnée, dans le même ordre.
+    """
+    return {
+        "latitude": _coordonnees(lat),
+        "longitude": _coordonnees(lon),
+        "start_date": start_date,
+        "end_date": end_date,
+        "daily": ",".join(DAILY_VARIABLES),
+        "timezone": TIMEZONE,
+    }
+
+
+def vers_dataframe(daily, ville_info):
+    """Convertit le bloc `daily` d'une réponse en DataFrame au format du projet."""
+    df = pd.DataFrame(daily)
+    df = df.rename(columns=COLUMN_MAPPING)
+    df["datetime"] = df["time"]
+    df["Ville"] = ville_info["ville"]
+    df["Pays"] = ville_info["pays"]
+    df["latitude"] = ville_info["lat"]
+    df["longitude"] = ville_info["lon"]
+    return df
+
+
+async def requeter_archive(client, params, limiter, base_url=None,
+                           max_retries=None, backoff_base=None, cache=None):
+    """
+    GET sur l'endpoint archive avec limitation de débit et relances.
+    Relance les erreurs réseau, les 5xx et les 429 ; lève l'erreur sur les autres 4xx
+    ou une fois les tentatives épuisées. Consulte puis alimente `cache` s'il est fourni.
+    """
+    if cache:
+        data = cache.get(params)
+        if data is not None:
+            return data
+
+    base_url = base_url or settings.OPENMETEO_ARCHIVE_URL
+    max_retries = settings.OPENMETEO_MAX_RETRIES if max_retries is None else max_retries
+    backoff_base = settings.OPENMETEO_BACKOFF_BASE if backoff_base is None else backoff_base
+
+    erreur = None
+    for tentative in range(max_retries + 1):
+        await limiter.acquire()
+        try:
+            response = await client.get(base_url, params=params)
+            response.raise_for_status()
+            data = response.json()
+            if cache:
+                cache.set(params, data)
+            return data
+        except httpx.HTTPStatusError as e:
+            erreur = e
+            status = e.response.status_code
+            if status == 429:
+                delai = _retry_after(e.response) or _delai_backoff(tentative, backoff_base)
+                logger.warning(f"🚫 Trop de requêtes (429), pause de {delai:.1f}s")
+                limiter.penalize(delai)
+                continue
+            if status < 500:
+                raise
+        except httpx.TransportError as e:
+            erreur = e
+        if tentative < max_retries:
+            await asyncio.sleep(_delai_backoff(tentative, backoff_base))
+    raise erreur
+
+
+async def _collecter_ville(client, ville_info, start_date, end_date, limiter, semaphore, options):
+    async with semaphore:
+        logger.info(f"🔄 Téléchargement : {ville_info['ville']}, {ville_info['pays']}")
+        params = construire_params(start_date, end_date, ville_info["lat"], ville_info["lon"])
+        data = await requeter_archive(client, params, limiter, **options)
+    return vers_dataframe(data["daily"], ville_info)
+
+
+async def _collecter_lot(client, lot, start_date, end_date, limiter, semaphore, options):
+    """
+    Télécharge un lot de villes en une seule requête multi-coordonnées et le
+    redécoupe ville par ville. Si le lot échoue, repli sur une requête par ville.
+    Retourne un résultat par ville (DataFrame ou exception).
+    """
+    if len(lot) > 1:
+        try:
+            async with semaphore:
+                logger.info(f"🔄 Téléchargement d'un lot de {len(lot)} villes "
+                            f"({lot[0]['ville']} … {lot[-1]['ville']})")
+                params = construire_params(start_date, end_date,
+                                           [v["lat"] for v in lot], [v["lon"] for v in lot])
+                data = await requeter_archive(client, params, limiter, **options)
+            reponses = data if isinstance(data, list) else [data]
+            if len(reponses) != len(lot):
+                raise ValueError(f"{len(reponses)} réponses pour {len(lot)} coordonnées")
+            return [vers_dataframe(r["daily"], v) for r, v in zip(reponses, lot)]
+        except Exception as e:
+            logger.warning(f"⚠️ Lot de {len(lot)} villes en échec ({e}), repli ville par ville")
+
+    return await asyncio.gather(
+        *(_collecter_ville(client, v, start_date, end_date, limiter, semaphore, options)
+          for v in lot),
+        return_exceptions=True,
+    )
+
+
+async def collecter_villes_async(villes, start_date, end_date, *, client=None,
+                                 base_url=None, max_concurrency=None, rate_limit=None,
+                                 burst=None, max_retries=None, backoff_base=None,
+                                 timeout=None, batch_size=None, cache=None, progression=None):
+    """
+    Télécharge l'historique journalier de chaque ville ({"pays", "ville", "lat", "lon"}),
+    par lots de `batch_size` coordonnées par requête (1 = une requête par ville).
+    `cache` : ResponseCache à utiliser (par défaut celui de la config, False pour aucun).
+    `progression` : appelée avec le nombre de villes de chaque lot terminé.
+    Retourne (frames, echecs) où echecs est une liste de (pays, ville, message).
+    """
+    if cache is None and settings.OPENMETEO_CACHE_ENABLED:
+        cache = ResponseCache()
+    batch_size = batch_size or settings.OPENMETEO_BATCH_SIZE
+    lots = [villes[i:i + batch_size] for i in range(0, len(villes), batch_size)]
+    max_concurrency = max_concurrency or settings.OPENMETEO_MAX_CONCURRENCY
+    limiter = TokenBucket(rate_limit or settings.OPENMETEO_RATE_LIMIT,
+                          burst or settings.OPENMETEO_BURST)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    options = {"base_url": base_url, "max_retries": max_retries,
+               "backoff_base": backoff_base, "cache": cache}
+
+    client_local = client is None
+    if client_local:
+        client = httpx.AsyncClient(
+            timeout=timeout or settings.OPENMETEO_TIMEOUT,
+            limits=httpx.Limits(max_connections=max_concurrency),
+        )
+    async def collecter_lot(lot):
+        resultats_lot = await _collecter_lot(client, lot, start_date, end_date, limiter, semaphore, options)
+        if progression:
+            progression(len(lot))
+        return resultats_lot
+
+    try:
+        resultats_lots = await asyncio.gather(*(collecter_lot(lot) for lot in lots))
+    finally:
+        if client_local:
+            await client.aclose()
+
+    resultats = [r for resultats_lot in resultats_lots for r in resultats_lot]
+    frames, echecs = [], []
+    for ville_info, resultat in zip(villes, resultats):
+        if isinstance(resultat, Exception):
+            logger.error(f"❌ Échec {ville_info['ville']} ({ville_info['pays']}) : {resultat}")
+            echecs.append((ville_info["pays"], ville_info["ville"], str(resultat)))
+        else:
+            frames.append(resultat)
+    logger.info(f"✅ {len(frames)}/{len(villes)} villes collectées")
+    if cache:
+        logger.info(f"🗄️ Cache HTTP : {cache.stats()}")
+    return frames, echecs
+
+
+def collecter_villes(villes, start_date, end_date, **options):
+    """Version synchrone de `collecter_villes_async` (scripts, threads de FastAPI)."""
+    return asyncio.run(collecter_villes_async(villes, start_date, end_date, **options))
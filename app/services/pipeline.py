@@ -0,0 +1,126 @@
+# app/services/pipeline.py
+"""
+Pipeline fusionné collecte → nettoyage → chargement, en mémoire.
+
+Les réponses JSON d'Open-Meteo sont converties une seule fois en DataFrames,
+qui passent directement au nettoyage puis au chargement : aucun fichier
+intermédiaire n'est relu. Les datasets Parquet (brut et nettoyé) ne sont
+écrits qu'en option (`checkpoint`), pour le tableau de bord et les reprises.
+
+Usage : python -m app.services.pipeline [--pays Mali Niger] [--complet] [--checkpoint]
+"""
+import argparse
+import logging
+from datetime import datetime
+
+import pandas as pd
+import psycopg2
+
+from app.core.config import settings
+from app.core.villes import lister_villes
+from app.services.load import DB_CONFIG, METHODE_CHARGEMENT, charger_donnees
+from app.services.openmeteo import collecter_villes
+from app.services.storage import ecrire_parquet
+from app.services.transform import nettoyer_donnees
+from app.services.watermark import WatermarkStore, collecter_incremental
+
+logger = logging.getLogger(__name__)
+
+
+def initialiser_marques(store, villes):
+    """
+    Sans marque pour une ville (premier passage sans checkpoint, fichier perdu),
+    reprend les dernières dates présentes dans l'entrepôt.
+    """
+    if all(store.get(v["pays"], v["ville"]) for v in villes):
+        return
+    try:
+        conn = psycopg2.connect(**DB_CONFIG)
+    except psycopg2.Error as e:
+        logger.warning(f"⚠️ Entrepôt injoignable, marques non initialisées : {e}")
+        return
+    try:
+        store.charger_depuis_entrepot(conn)
+    except psycopg2.Error as e:
+        logger.warning(f"⚠️ Marques non lues depuis l'entrepôt : {e}")
+    finally:
+        conn.close()
+
+
+def executer_pipeline(pays=None, start_date=None, end_date=None, incremental=True,
+                      checkpoint=False, methode=METHODE_CHARGEMENT,
+                      progression=None, sur_etape=None):
+    """
+    Collecte les villes de `pays` (toutes par défaut), nettoie et charge le
+    résultat sans passer par le disque. En mode incrémental, les marques ne
+    sont avancées qu'une fois les données chargées dans l'entrepôt.
+    `progression` reçoit le nombre de villes traitées, `sur_etape` le nom de
+    chaque étape. Retourne les volumes de chaque étape et les échecs.
+    """
+    start_date = start_date or settings.OPENMETEO_START_DATE
+    end_date = end_date or datetime.now().strftime("%Y-%m-%d")
+    villes = lister_villes(pays)
+    resultat = {"lignes_collectees": 0, "lignes_nettoyees": 0, "lignes_chargees": 0, "echecs": []}
+
+    def etape(nom):
+        logger.info(f"▶️ Étape : {nom}")
+        if sur_etape:
+            sur_etape(nom)
+
+    etape("collecte")
+    store = None
+    if incremental:
+        store = WatermarkStore()
+        initialiser_marques(store, villes)
+        frames, echecs = collecter_incremental(villes, start_date, end_date, store,
+                                               sauvegarder=False, progression=progression)
+    else:
+        frames, echecs = collecter_villes(villes, start_date, end_date, progression=progression)
+    resultat["echecs"] = echecs
+    if not frames:
+        logger.info("✅ Aucune nouvelle donnée collectée")
+        return resultat
+
+    df_brut = pd.concat(frames, ignore_index=True)
+    resultat["lignes_collectees"] = len(df_brut)
+    if checkpoint:
+        ecrire_parquet(df_brut, settings.RAW_DATASET_DIR)
+
+    etape("transformation")
+    df_propre = nettoyer_donnees(df_brut)
+    resultat["lignes_nettoyees"] = len(df_propre)
+    if checkpoint:
+        ecrire_parquet(df_propre, settings.CLEAN_DATASET_DIR)
+
+    etape("chargement")
+    resultat["lignes_chargees"] = charger_donnees(methode, df=df_propre)
+
+    if store:
+        store.mettre_a_jour(frames)
+        store.sauvegarder()
+    logger.info(f"🎉 Pipeline terminé : {resultat['lignes_collectees']} lignes collectées, "
+                f"{resultat['lignes_chargees']} faits chargés, {len(echecs)} ville(s) en échec")
+    return resultat
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Collecte, nettoyage et chargement en mémoire")
+    parser.add_argument("--pays", nargs="*", help="pays à traiter (tous par défaut)")
+    parser.add_argument("--debut", help="date de début (AAAA-MM-JJ)")
+    parser.add_argument("--fin", help="date de fin (AAAA-MM-JJ, aujourd'hui par défaut)")
+    parser.add_argument("--complet", action="store_true", help="collecte complète (ignore les marques)")
+    parser.add_argument("--checkpoint", action="store_true",
+                        help="écrit aussi les datasets Parquet brut et nettoyé")
+    parser.add_argument("--methode", choices=["copy", "execute_batch"], default=METHODE_CHARGEMENT)
+    args = parser.parse_args(arguments)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    resultat = executer_pipeline(args.pays or None, args.debut, args.fin, incremental=not args.complet,
+                                 checkpoint=args.checkpoint, methode=args.methode)
+    for pays, ville, message in resultat["echecs"]:
+        logger.error(f"❌ Échec {ville}, {pays} ({message})")
+    return 1 if resultat["echecs"] and not resultat["lignes_collectees"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
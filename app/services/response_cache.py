@@ -0,0 +1,91 @@
+# app/services/response_cache.py
+"""
+Cache disque des réponses de l'API archive d'Open-Meteo.
+
+Chaque réponse est stockée (JSON gzip) sous une clé SHA-256 des paramètres de
+la requête (coordonnées, plage de dates, variables journalières, fuseau).
+Une plage entièrement dans le passé n'expire jamais ; une plage qui touche les
+derniers jours (encore susceptibles d'être complétés par l'API) expire vite.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Cache de réponses JSON sur disque, avec compteurs de hits/miss."""
+
+    def __init__(self, repertoire=None, ttl_recent=None, jours_recents=None):
+        self.repertoire = Path(repertoire or settings.OPENMETEO_CACHE_DIR)
+        self.ttl_recent = settings.OPENMETEO_CACHE_TTL_RECENT if ttl_recent is None else ttl_recent
+        self.jours_recents = settings.OPENMETEO_CACHE_RECENT_DAYS if jours_recents is None else jours_recents
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.writes = 0
+
+    @staticmethod
+    def cle(params):
+        """Clé de contenu : SHA-256 des paramètres triés."""
+        canonique = json.dumps({k: str(v) for k, v in params.items()}, sort_keys=True)
+        return hashlib.sha256(canonique.encode("utf-8")).hexdigest()
+
+    def _chemin(self, cle):
+        return self.repertoire / cle[:2] / f"{cle}.json.gz"
+
+    def _est_definitif(self, end_date):
+        """Vrai si la plage se termine avant la fenêtre des jours récents."""
+        limite = date.today() - timedelta(days=self.jours_recents)
+        return date.fromisoformat(str(end_date)[:10]) < limite
+
+    def get(self, params):
+        """Réponse en cache pour ces paramètres, ou None (absente ou expirée)."""
+        chemin = self._chemin(self.cle(params))
+        try:
+            with gzip.open(chemin, "rt", encoding="utf-8") as f:
+                entree = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        if not entree["definitif"] and time.time() - entree["stocke_le"] > self.ttl_recent:
+            self.expired += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entree["data"]
+
+    def set(self, params, data):
+        """Enregistre une réponse (écriture atomique)."""
+        chemin = self._chemin(self.cle(params))
+        chemin.parent.mkdir(parents=True, exist_ok=True)
+        entree = {
+            "stocke_le": time.time(),
+            "definitif": self._est_definitif(params["end_date"]),
+            "data": data,
+        }
+        tmp = chemin.with_name(chemin.name + f".{os.getpid()}.tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(entree, f)
+        os.replace(tmp, chemin)
+        self.writes += 1
+
+    def stats(self):
+        """Compteurs du cache depuis sa création."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "writes": self.writes,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+        }
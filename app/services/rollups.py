@@ -0,0 +1,283 @@
+# app/services/rollups.py
+"""
+Agrégats pré-calculés de faits_meteo pour l'API de statistiques.
+
+Deux tables d'agrégats additifs (sommes et effectifs, pas de moyennes) :
+- agg_meteo_ville : par ville et par mois / année ;
+- agg_meteo_pays  : par pays et par jour / mois / année.
+Le grain journalier d'une ville est faits_meteo lui-même.
+
+Après chaque chargement, seules les périodes touchées par les dates chargées
+sont recalculées depuis faits_meteo (INSERT ... SELECT ... ON CONFLICT).
+Une statistique sur une plage de dates se décompose en années complètes,
+mois complets et jours restants : quelques centaines de lignes agrégées lues
+au lieu d'un parcours de faits_meteo.
+"""
+import logging
+from datetime import date, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Grain -> unité de date_trunc
+GRAINS = {"jour": "day", "mois": "month", "annee": "year"}
+GRAINS_VILLE = ["mois", "annee"]
+GRAINS_PAYS = ["jour", "mois", "annee"]
+# Bornes des plages ouvertes (alignées sur des années complètes)
+DATE_MIN, DATE_MAX = date(1900, 1, 1), date(2999, 12, 31)
+
+# Niveau -> (table d'agrégats, colonne de regroupement, clé de jointure)
+NIVEAUX = {
+    "ville": ("agg_meteo_ville", "id_dim_lieu", "f.id_dim_lieu"),
+    "pays": ("agg_meteo_pays", "pays", "l.pays"),
+}
+
+COLONNES_AGREGATS = ["nb_jours", "temp_somme", "temp_nb", "temp_min", "temp_max",
+                     "precip_total", "date_debut", "date_fin"]
+
+SQL_CREATION_AGREGATS = """
+    CREATE TABLE IF NOT EXISTS agg_meteo_ville (
+        grain TEXT NOT NULL,
+        periode DATE NOT NULL,
+        id_dim_lieu INTEGER NOT NULL,
+        nb_jours INTEGER NOT NULL,
+        temp_somme DOUBLE PRECISION,
+        temp_nb INTEGER NOT NULL,
+        temp_min DOUBLE PRECISION,
+        temp_max DOUBLE PRECISION,
+        precip_total DOUBLE PRECISION NOT NULL,
+        date_debut DATE NOT NULL,
+        date_fin DATE NOT NULL,
+        PRIMARY KEY (grain, periode, id_dim_lieu)
+    );
+    CREATE TABLE IF NOT EXISTS agg_meteo_pays (
+        grain TEXT NOT NULL,
+        periode DATE NOT NULL,
+        pays TEXT NOT NULL,
+        nb_jours INTEGER NOT NULL,
+        temp_somme DOUBLE PRECISION,
+        temp_nb INTEGER NOT NULL,
+        temp_min DOUBLE PRECISION,
+        temp_max DOUBLE PRECISION,
+        precip_total DOUBLE PRECISION NOT NULL,
+        date_debut DATE NOT NULL,
+        date_fin DATE NOT NULL,
+        PRIMARY KEY (grain, periode, pays)
+    );
+"""
+
+# Expressions d'agrégation depuis faits_meteo, dans l'ordre de COLONNES_AGREGATS
+AGREGATS_FAITS = """
+    count(*), sum(f.temp::float8), count(f.temp), min(f.tempmin), max(f.tempmax),
+    coalesce(sum(f.precip::float8), 0), min(f.datecollect), max(f.datecollect)
+"""
+
+# Grain journalier d'une ville : les faits eux-mêmes, au format des agrégats
+SOURCE_FAITS_VILLE = """
+    SELECT f.datecollect AS periode, f.id_dim_lieu, 1 AS nb_jours,
+           f.temp AS temp_somme, CASE WHEN f.temp IS NULL THEN 0 ELSE 1 END AS temp_nb,
+           f.tempmin AS temp_min, f.tempmax AS temp_max, coalesce(f.precip, 0) AS precip_total,
+           f.datecollect AS date_debut, f.datecollect AS date_fin
+    FROM faits_meteo f
+"""
+
+
+def sql_rafraichissement(niveau, grain):
+    """
+    INSERT ... SELECT ... ON CONFLICT recalculant les périodes de `grain` qui
+    recoupent [%(debut)s, %(fin)s] (toutes les périodes si les bornes sont nulles).
+    """
+    table, colonne, cle = NIVEAUX[niveau]
+    unite = GRAINS[grain]
+    jointure = "JOIN dim_lieu l ON l.id_dim_lieu = f.id_dim_lieu" if niveau == "pays" else ""
+    return f"""
+        INSERT INTO {table} (grain, periode, {colonne}, {", ".join(COLONNES_AGREGATS)})
+        SELECT '{grain}', date_trunc('{unite}', f.datecollect)::date, {cle}, {AGREGATS_FAITS}
+        FROM faits_meteo f {jointure}
+        WHERE (%(debut)s::date IS NULL OR f.datecollect >= date_trunc('{unite}', %(debut)s::date))
+          AND (%(fin)s::date IS NULL
+               OR f.datecollect < date_trunc('{unite}', %(fin)s::date) + interval '1 {unite}')
+        GROUP BY 2, 3
+        ON CONFLICT (grain, periode, {colonne}) DO UPDATE SET
+            {", ".join(f"{col} = EXCLUDED.{col}" for col in COLONNES_AGREGATS)}
+    """
+
+
+def rafraichir_agregats(conn, debut=None, fin=None):
+    """
+    Recalcule les agrégats des périodes contenant les dates [debut, fin]
+    (connexion psycopg2, sans commit). Reconstruction complète si les bornes
+    sont absentes ou si les agrégats sont encore vides.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(SQL_CREATION_AGREGATS)
+        cursor.execute("SELECT NOT EXISTS (SELECT 1 FROM agg_meteo_ville)")
+        if cursor.fetchone()[0]:
+            debut = fin = None
+        portee = f"{debut} → {fin}" if debut or fin else "reconstruction complète"
+        logger.info(f"📊 Rafraîchissement des agrégats ({portee})...")
+        for niveau, grains in [("ville", GRAINS_VILLE), ("pays", GRAINS_PAYS)]:
+            for grain in grains:
+                cursor.execute(sql_rafraichissement(niveau, grain), {"debut": debut, "fin": fin})
+                logger.info(f"✅ {NIVEAUX[niveau][0]} [{grain}] : {cursor.rowcount} périodes")
+
+
+async def creer_agregats(engine):
+    """
+    Crée les tables d'agrégats si besoin (démarrage de l'API) : avant le
+    premier chargement, les statistiques sont vides au lieu d'échouer.
+    """
+    async with engine.begin() as conn:
+        for instruction in filter(str.strip, SQL_CREATION_AGREGATS.split(";")):
+            await conn.exec_driver_sql(instruction)
+
+
+# === Lecture : décomposition d'une plage de dates en périodes complètes ===
+def _debut_periode(jour, grain):
+    if grain == "annee":
+        return jour.replace(month=1, day=1)
+    if grain == "mois":
+        return jour.replace(day=1)
+    return jour
+
+
+def _periode_suivante(jour, grain):
+    if grain == "annee":
+        return jour.replace(year=jour.year + 1)
+    if grain == "mois":
+        return (jour.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return jour + timedelta(days=1)
+
+
+def decouper_plage(debut, fin, grains=("annee", "mois", "jour")):
+    """
+    Segments (grain, premiere_periode, derniere_periode) couvrant exactement
+    [debut, fin] : le plus de périodes longues possible, complétées aux bords
+    par les grains plus fins.
+    """
+    if debut > fin:
+        return []
+    grain, plus_fins = grains[0], grains[1:]
+    if not plus_fins:
+        return [(grain, debut, fin)]
+    premiere = _debut_periode(debut, grain)
+    if premiere < debut:
+        premiere = _periode_suivante(premiere, grain)
+    # Début de la période qui suit la dernière période complète
+    apres = _periode_suivante(_debut_periode(fin, grain), grain)
+    if apres - timedelta(days=1) != fin:
+        apres = _debut_periode(fin, grain)
+    if premiere >= apres:
+        return decouper_plage(debut, fin, plus_fins)
+    derniere = _debut_periode(apres - timedelta(days=1), grain)
+    return (decouper_plage(debut, premiere - timedelta(days=1), plus_fins)
+            + [(grain, premiere, derniere)]
+            + decouper_plage(apres, fin, plus_fins))
+
+
+def _source(niveau, grain):
+    if niveau == "ville" and grain == "jour":
+        return f"({SOURCE_FAITS_VILLE})"
+    return NIVEAUX[niveau][0]
+
+
+def construire_requete_agregats(niveau, debut=None, fin=None):
+    """
+    Sous-requête UNION ALL des lignes d'agrégats couvrant [debut, fin]
+    et ses paramètres (nommés pour sqlalchemy.text).
+    """
+    _, colonne, _ = NIVEAUX[niveau]
+    debut, fin = debut or DATE_MIN, fin or DATE_MAX
+    parties, params = [], {}
+    for i, (grain, premiere, derniere) in enumerate(decouper_plage(debut, fin)):
+        filtre_grain = "" if niveau == "ville" and grain == "jour" else f"a.grain = '{grain}' AND "
+        parties.append(f"""
+            SELECT a.{colonne}, {", ".join(f"a.{col}" for col in COLONNES_AGREGATS)}
+            FROM {_source(niveau, grain)} a
+            WHERE {filtre_grain}a.periode BETWEEN :p{i}_debut AND :p{i}_fin
+        """)
+        params[f"p{i}_debut"], params[f"p{i}_fin"] = premiere, derniere
+    return " UNION ALL ".join(parties), params
+
+
+# Ré-agrégation des lignes d'agrégats (sommes et effectifs additifs)
+RESUME_AGREGATS = """
+    sum(a.temp_somme) / nullif(sum(a.temp_nb), 0) AS temp_moyenne,
+    min(a.temp_min) AS temp_min, max(a.temp_max) AS temp_max,
+    sum(a.precip_total) AS precip_total, sum(a.nb_jours) AS nb_jours,
+    min(a.date_debut) AS date_debut, max(a.date_fin) AS date_fin
+"""
+
+
+def construire_requete_resume(niveau, pays=None, ville=None, date_debut=None, date_fin=None):
+    """Résumé par ville ou par pays sur [date_debut, date_fin]."""
+    union, params = construire_requete_agregats(niveau, date_debut, date_fin)
+    conditions = []
+    if pays:
+        conditions.append("lower(l.pays) = lower(:pays)")
+        params["pays"] = pays
+    if niveau == "ville":
+        if ville:
+            conditions.append("lower(l.ville) = lower(:ville)")
+            params["ville"] = ville
+        select, jointure, groupe = ("l.ville, l.pays", "JOIN dim_lieu l ON l.id_dim_lieu = a.id_dim_lieu",
+                                    "l.ville, l.pays")
+    else:
+        select, jointure, groupe = "a.pays AS pays", "", "a.pays"
+        conditions = [c.replace("l.pays", "a.pays") for c in conditions]
+    where = "WHERE " + " AND ".join(conditions) if conditions else ""
+    sql = f"""
+        SELECT {select}, {RESUME_AGREGATS}
+        FROM ({union}) a {jointure}
+        {where}
+        GROUP BY {groupe}
+        ORDER BY {groupe}
+    """
+    return sql, params
+
+
+def construire_requete_evolution(niveau, grain, pays=None, ville=None, date_debut=None, date_fin=None):
+    """Série des agrégats de `grain` (une ligne par période et par ville ou pays)."""
+    if grain not in GRAINS:
+        raise ValueError(f"Grain inconnu : {grain} (disponibles : {', '.join(GRAINS)})")
+    conditions, params = [], {}
+    if niveau == "ville":
+        jointure, cles, tri = "JOIN dim_lieu l ON l.id_dim_lieu = a.id_dim_lieu", "l.ville, l.pays", "l.pays, l.ville"
+        alias_pays = "l"
+        if ville:
+            conditions.append("lower(l.ville) = lower(:ville)")
+            params["ville"] = ville
+    else:
+        jointure, cles, tri, alias_pays = "", "a.pays AS pays", "a.pays", "a"
+    if not (niveau == "ville" and grain == "jour"):
+        conditions.append(f"a.grain = '{grain}'")
+    if pays:
+        conditions.append(f"lower({alias_pays}.pays) = lower(:pays)")
+        params["pays"] = pays
+    if date_debut:
+        conditions.append("a.date_fin >= :date_debut")
+        params["date_debut"] = date_debut
+    if date_fin:
+        conditions.append("a.date_debut <= :date_fin")
+        params["date_fin"] = date_fin
+    sql = f"""
+        SELECT a.periode, {cles},
+               a.temp_somme / nullif(a.temp_nb, 0) AS temp_moyenne, a.temp_min, a.temp_max,
+               a.precip_total, a.nb_jours
+        FROM {_source(niveau, grain)} a {jointure}
+        {"WHERE " + " AND ".join(conditions) if conditions else ""}
+        ORDER BY a.periode, {tri}
+    """
+    return sql, params
+
+
+if __name__ == "__main__":
+    import psycopg2
+    from app.services.load import DB_CONFIG
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        rafraichir_agregats(conn)
+        conn.commit()
+    finally:
+        conn.close()
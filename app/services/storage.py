@@ -0,0 +1,322 @@
+# app/services/storage.py
+"""
+Stockage colonnaire des jeux de données météo (brut et nettoyé).
+
+Les données sont écrites en Parquet, partitionnées par Pays/annee/mois (hive),
+avec des types compacts : Ville/Pays/conditions en catégories, mesures en
+float32 (coordonnées en float64), dates en datetime64. Toutes les étapes lisent via `lire_parquet`, qui
+ne charge que les colonnes demandées et élague les partitions hors filtre.
+Le CSV n'est plus qu'un format d'export (`exporter_csv`).
+"""
+import logging
+import os
+import shutil
+import uuid
+from functools import reduce
+from pathlib import Path
+from urllib.parse import unquote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+logger = logging.getLogger(__name__)
+
+PARTITIONS = ["Pays", "annee", "mois"]
+CLE_OBSERVATION = ["datetime", "Pays", "Ville"]
+
+COLONNES_CATEGORIES = ["Pays", "Ville", "conditions"]
+# Coordonnées en float64 : en float32, 14.7167 se relirait 14.716699600219727
+COLONNES_COORDONNEES = ["latitude", "longitude"]
+COLONNES_MESURES = [
+    "temp", "tempmax", "tempmin",
+    "feelslike", "feelslikemax", "feelslikemin", "dew", "humidity", "precip",
+    "precipcover", "windgust", "windspeed", "winddir", "cloudcover",
+    "solarradiation", "solarenergy", "uvindex"
+]
+
+SCHEMA_PARTITIONS = pa.schema([
+    ("Pays", pa.dictionary(pa.int32(), pa.string())),
+    ("annee", pa.int16()),
+    ("mois", pa.int8()),
+])
+
+
+def typer(df):
+    """Applique les types de stockage (catégories, float32, datetime64)."""
+    df = df.drop(columns=["time"], errors="ignore")
+    if "datetime" in df.columns:
+        df["datetime"] = pd.to_datetime(df["datetime"])
+    for col in COLONNES_COORDONNEES:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    for col in COLONNES_MESURES:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float32")
+    for col in COLONNES_CATEGORIES:
+        if col not in df.columns:
+            continue
+        if pd.api.types.is_numeric_dtype(df[col]):
+            # Données brutes : `conditions` contient encore le code météo numérique
+            df[col] = df[col].astype("float32")
+        else:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def _sans_categories(df):
+    """Repasse les catégories en objets (concaténation de catégories différentes)."""
+    return df.astype({c: object for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)})
+
+
+def _partitioning():
+    return ds.partitioning(SCHEMA_PARTITIONS, flavor="hive", dictionaries="infer")
+
+
+def _filtre_partitions(partitions):
+    """Expression OU sur les couples (Pays, annee, mois) donnés."""
+    return reduce(
+        lambda a, b: a | b,
+        ((ds.field("Pays") == p) & (ds.field("annee") == a) & (ds.field("mois") == m)
+         for p, a, m in partitions.itertuples(index=False))
+    )
+
+
+def _filtre_dates(date_debut, date_fin):
+    """Filtre élaguant les partitions annee/mois puis les lignes hors plage."""
+    filtres = []
+    if date_debut is not None:
+        debut = pd.Timestamp(date_debut)
+        filtres.append((ds.field("annee") > debut.year)
+                       | ((ds.field("annee") == debut.year) & (ds.field("mois") >= debut.month)))
+        filtres.append(ds.field("datetime") >= debut)
+    if date_fin is not None:
+        fin = pd.Timestamp(date_fin)
+        filtres.append((ds.field("annee") < fin.year)
+                       | ((ds.field("annee") == fin.year) & (ds.field("mois") <= fin.month)))
+        filtres.append(ds.field("datetime") <= fin)
+    return filtres
+
+
+def dataset_existe(dossier):
+    """Vrai si le dossier contient au moins un fichier Parquet."""
+    return Path(dossier).exists() and any(Path(dossier).rglob("*.parquet"))
+
+
+def version_dataset(dossier):
+    """
+    Signature du dataset (nombre de fichiers, dernière modification en ns) :
+    change à chaque écriture, sans ouvrir les fichiers.
+    """
+    nb, derniere = 0, 0
+    for racine, _, fichiers in os.walk(dossier):
+        for nom in fichiers:
+            if nom.endswith(".parquet"):
+                try:
+                    derniere = max(derniere, os.stat(os.path.join(racine, nom)).st_mtime_ns)
+                except FileNotFoundError:   # partition remplacée pendant le parcours
+                    continue
+                nb += 1
+    return nb, derniere
+
+
+def ouvrir_dataset(dossier):
+    """Dataset pyarrow partitionné (hive) sur le dossier."""
+    return ds.dataset(dossier, format="parquet", partitioning=_partitioning())
+
+
+def _scanner(dataset, colonnes=None, pays=None, villes=None, date_debut=None, date_fin=None):
+    """Colonnes et filtre (projection + élagage des partitions) d'une lecture."""
+    filtres = _filtre_dates(date_debut, date_fin)
+    if pays:
+        pays = [pays] if isinstance(pays, str) else list(pays)
+        filtres.append(ds.field("Pays").isin(pays))
+    if villes:
+        villes = [villes] if isinstance(villes, str) else list(villes)
+        filtres.append(ds.field("Ville").isin(villes))
+
+    if colonnes is None:
+        colonnes = [c for c in dataset.schema.names if c not in ("annee", "mois")]
+    filtre = reduce(lambda a, b: a & b, filtres) if filtres else None
+    return list(colonnes), filtre
+
+
+def lire_parquet(dossier, colonnes=None, **filtres):
+    """
+    Lit le dataset en ne chargeant que `colonnes` (toutes par défaut, sans les
+    colonnes techniques annee/mois) et les partitions correspondant aux filtres
+    (pays, villes, date_debut, date_fin).
+    """
+    dataset = ouvrir_dataset(dossier)
+    colonnes, filtre = _scanner(dataset, colonnes, **filtres)
+    return dataset.to_table(columns=colonnes, filter=filtre).to_pandas()
+
+
+def iterer_lots(dossier, taille_lot, colonnes=None, **filtres):
+    """
+    Lots Arrow (RecordBatch, au plus `taille_lot` lignes, jamais vides) du
+    dataset, lus au fil de l'eau. Mêmes filtres que `lire_parquet`.
+    """
+    dataset = ouvrir_dataset(dossier)
+    colonnes, filtre = _scanner(dataset, colonnes, **filtres)
+    for batch in dataset.to_batches(columns=colonnes, filter=filtre, batch_size=taille_lot):
+        if batch.num_rows:
+            yield batch
+
+
+def iterer_parquet(dossier, taille_chunk, colonnes=None, **filtres):
+    """
+    Parcourt le dataset par blocs d'environ `taille_chunk` lignes (DataFrames),
+    sans jamais le charger en entier. Mêmes filtres que `lire_parquet`.
+    """
+    tampon, lignes = [], 0
+    for batch in iterer_lots(dossier, taille_chunk, colonnes, **filtres):
+        tampon.append(batch)
+        lignes += batch.num_rows
+        if lignes >= taille_chunk:
+            yield pa.Table.from_batches(tampon).to_pandas()
+            tampon, lignes = [], 0
+    if tampon:
+        yield pa.Table.from_batches(tampon).to_pandas()
+
+
+def ecrire_parquet(df, dossier):
+    """
+    Écrit `df` dans le dataset. Chaque partition (Pays, annee, mois) touchée est
+    relue, fusionnée avec les nouvelles lignes (la dernière version de chaque
+    observation l'emporte) puis réécrite : l'écriture est idempotente et
+    convient aux ajouts incrémentaux. Retourne le nombre de lignes écrites.
+    """
+    df = typer(df.copy())
+    df["annee"] = df["datetime"].dt.year.astype("int16")
+    df["mois"] = df["datetime"].dt.month.astype("int8")
+
+    if dataset_existe(dossier):
+        partitions = df[PARTITIONS].drop_duplicates().astype({"Pays": str})
+        existant = ouvrir_dataset(dossier).to_table(filter=_filtre_partitions(partitions)).to_pandas()
+        if not existant.empty:
+            fusion = pd.concat([_sans_categories(existant), _sans_categories(df)], ignore_index=True)
+            fusion = fusion.drop_duplicates(subset=CLE_OBSERVATION, keep="last")
+            df = typer(fusion).astype({"annee": "int16", "mois": "int8"})
+
+    df = df.sort_values(["Pays", "Ville", "datetime"], ignore_index=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    ds.write_dataset(
+        table, dossier,
+        format="parquet",
+        partitioning=PARTITIONS,
+        partitioning_flavor="hive",
+        existing_data_behavior="delete_matching",
+        basename_template="part-{i}.parquet",
+    )
+    logger.info(f"💾 {len(df)} lignes écrites dans {dossier}")
+    return len(df)
+
+
+class EcrivainParquet:
+    """
+    Écriture d'un dataset complet bloc par bloc. Les blocs sont écrits dans un
+    dossier temporaire qui remplace le dataset cible à la fermeture : la mémoire
+    est bornée par la taille d'un bloc et les lecteurs ne voient jamais un
+    dataset à moitié écrit.
+
+    Avec `pays`, seules les partitions de ces pays sont remplacées : plusieurs
+    écrivains (un par pays) peuvent alors travailler en parallèle sur le même
+    dataset.
+    """
+
+    def __init__(self, dossier, pays=None):
+        self.dossier = Path(dossier)
+        self.pays = None if pays is None else {pays} if isinstance(pays, str) else set(pays)
+        suffixe = ".tmp" if self.pays is None else f".tmp-{uuid.uuid4().hex[:8]}"
+        self.temporaire = self.dossier.with_name(self.dossier.name + suffixe)
+        self.lignes = 0
+        self._blocs = 0
+        shutil.rmtree(self.temporaire, ignore_errors=True)
+
+    def ecrire(self, df):
+        """Ajoute un bloc au dataset en cours d'écriture."""
+        df = typer(df)
+        df["annee"] = df["datetime"].dt.year.astype("int16")
+        df["mois"] = df["datetime"].dt.month.astype("int8")
+        ds.write_dataset(
+            pa.Table.from_pandas(df, preserve_index=False), self.temporaire,
+            format="parquet",
+            partitioning=PARTITIONS,
+            partitioning_flavor="hive",
+            existing_data_behavior="overwrite_or_ignore",
+            basename_template=f"part-{self._blocs}-{{i}}.parquet",
+        )
+        self._blocs += 1
+        self.lignes += len(df)
+
+    def fermer(self):
+        """
+        Remplace le dataset cible (ou les partitions des pays) par le dataset écrit.
+        Sans aucune ligne écrite, la cible est laissée intacte.
+        """
+        if self.lignes == 0:
+            shutil.rmtree(self.temporaire, ignore_errors=True)
+            logger.warning(f"⚠️ Aucune ligne écrite : {self.dossier} laissé inchangé")
+            return
+        if self.pays is None:
+            _remplacer(self.temporaire, self.dossier)
+        else:
+            self.dossier.mkdir(parents=True, exist_ok=True)
+            ecrits = {d.name: d for d in self.temporaire.iterdir()} if self.temporaire.exists() else {}
+            anciens = {d.name for d in self.dossier.iterdir() if _pays_du_dossier(d) in self.pays}
+            for nom in anciens | set(ecrits):
+                # Ancienne partition déplacée hors du dataset : jamais lue par les lecteurs concurrents
+                _remplacer(ecrits.get(nom), self.dossier / nom, corbeille=self.temporaire)
+            shutil.rmtree(self.temporaire, ignore_errors=True)
+        portee = "" if self.pays is None else f" [{', '.join(sorted(self.pays))}]"
+        logger.info(f"💾 {self.lignes} lignes écrites dans {self.dossier}{portee} ({self._blocs} blocs)")
+
+    def annuler(self):
+        shutil.rmtree(self.temporaire, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.fermer()
+        else:
+            self.annuler()
+        return False
+
+
+def _remplacer(source, cible, corbeille=None):
+    """
+    Remplace le dossier `cible` par `source` (suppression si `source` est None).
+    L'ancien dossier est renommé dans `corbeille` (par défaut à côté de la cible)
+    avant d'être supprimé.
+    """
+    corbeille = cible.parent if corbeille is None else corbeille
+    ancien = corbeille / f"{cible.name}.old-{uuid.uuid4().hex[:8]}"
+    if cible.exists():
+        cible.rename(ancien)
+    if source is not None and source.exists():
+        source.rename(cible)
+    shutil.rmtree(ancien, ignore_errors=True)
+
+
+def _pays_du_dossier(dossier):
+    """Pays d'un dossier de partition hive `Pays=...` (nom encodé en URI), sinon None."""
+    cle, _, valeur = dossier.name.partition("=")
+    return unquote(valeur) if cle == "Pays" and dossier.is_dir() else None
+
+
+def exporter_csv(dossier, chemin_csv, **filtres):
+    """Exporte (tout ou partie) d'un dataset Parquet au format CSV."""
+    df = lire_parquet(dossier, **filtres)
+    df.to_csv(chemin_csv, index=False)
+    logger.info(f"📤 {len(df)} lignes exportées vers {chemin_csv}")
+    return len(df)
+
+
+if __name__ == "__main__":
+    # Export ponctuel : python -m app.services.storage <dataset> <fichier.csv>
+    import sys
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    exporter_csv(sys.argv[1], sys.argv[2])
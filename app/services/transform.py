@@ -1,13 +1,71 @@
+import numpy as np
 import pandas as pd
 import logging
 from datetime import datetime
 
+from app.core.config import settings
+from app.services.storage import EcrivainParquet, iterer_parquet
+
 # === Configuration du logging ===
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# === Configuration des fichiers ===
-input_csv = "/Users/NOKHO/Desktop/Meteo/historique_meteo_uemoa_80villes.csv"
-output_csv = "/Users/NOKHO/Desktop/Meteo/historique_meteo_uemoa_80villes_clean.csv"
+# === Configuration des datasets (Parquet partitionné) ===
+input_dataset = settings.RAW_DATASET_DIR
+output_dataset = settings.CLEAN_DATASET_DIR
+taille_chunk = settings.TRANSFORM_CHUNK_SIZE
+
+# === Tables de correspondance ===
+WEATHER_CODES = {
+    0: 'Ensoleillé', 1: 'Principalement clair', 2: 'Partiellement nuageux', 3: 'Couvert',
+    45: 'Brouillard', 48: 'Brouillard givrant', 51: 'Bruine légère', 53: 'Bruine modérée',
+    55: 'Bruine dense', 56: 'Bruine verglaçante légère', 57: 'Bruine verglaçante dense',
+    61: 'Pluie légère', 63: 'Pluie modérée', 65: 'Pluie forte', 66: 'Pluie verglaçante légère',
+    67: 'Pluie verglaçante forte', 71: 'Chute de neige légère', 73: 'Chute de neige modérée',
+    75: 'Chute de neige forte', 77: 'Grains de neige', 80: 'Averses de pluie légères',
+    81: 'Averses de pluie modérées', 82: 'Averses de pluie violentes', 85: 'Averses de neige légères',
+    86: 'Averses de neige fortes', 95: 'Orage léger ou modéré', 96: 'Orage avec grêle légère',
+    99: 'Orage avec grêle forte'
+}
+
+CLOUD_COVER = {
+    'Ensoleillé': 0.2, 'Principalement clair': 0.2,
+    'Partiellement nuageux': 0.5,
+    'Couvert': 0.8,
+    'Brouillard': 1.0, 'Brouillard givrant': 1.0,
+}
+CLOUD_COVER_DEFAUT = 0.6
+
+NUMERIC_COLS = ['tempmax', 'tempmin', 'temp', 'feelslikemax', 'feelslikemin',
+                'feelslike', 'dew', 'precip', 'windgust', 'windspeed',
+                'solarradiation', 'solarenergy', 'uvindex']
+
+
+def normaliser_conditions(serie):
+    """
+    Normalise une colonne de conditions (codes WMO ou texte) en libellés catégoriels.
+    Seules les valeurs distinctes sont converties, puis redistribuées par leurs codes :
+    un code numérique devient son libellé (ou 'Inconnu'), un texte est nettoyé et
+    capitalisé, une valeur manquante devient 'Inconnu'.
+    """
+    codes, uniques = pd.factorize(serie)
+    uniques = pd.Series(np.asarray(uniques, dtype=object))
+
+    numeriques = pd.to_numeric(uniques, errors='coerce')
+    finis = np.isfinite(numeriques.to_numpy(dtype='float64', na_value=np.nan))
+    libelles = uniques.astype(str).str.strip().str.capitalize()
+    libelles[finis] = (np.trunc(numeriques[finis]).astype('int64')
+                       .map(WEATHER_CODES).fillna('Inconnu'))
+
+    # Dernière entrée : valeur manquante (code -1 de factorize)
+    codes_libelles, categories = pd.factorize(np.append(libelles.to_numpy(dtype=object), 'Inconnu'))
+    return pd.Categorical.from_codes(codes_libelles[codes], categories=categories)
+
+
+def cloud_cover_depuis_conditions(conditions):
+    """Couverture nuageuse estimée à partir des libellés catégoriels (une valeur par catégorie)."""
+    valeurs = np.array([CLOUD_COVER.get(c, CLOUD_COVER_DEFAUT) for c in conditions.categories])
+    return valeurs[conditions.codes]
+
 
 # === Nettoyage des données ===
 def nettoyer_donnees(df):
@@ -17,49 +75,25 @@ def nettoyer_donnees(df):
     logging.info("⏳ Conversion des dates...")
     df['datetime'] = pd.to_datetime(df['datetime'])
 
-    weather_codes = {
-        0: 'Ensoleillé', 1: 'Principalement clair', 2: 'Partiellement nuageux', 3: 'Couvert',
-        45: 'Brouillard', 48: 'Brouillard givrant', 51: 'Bruine légère', 53: 'Bruine modérée',
-        55: 'Bruine dense', 56: 'Bruine verglaçante légère', 57: 'Bruine verglaçante dense',
-        61: 'Pluie légère', 63: 'Pluie modérée', 65: 'Pluie forte', 66: 'Pluie verglaçante légère',
-        67: 'Pluie verglaçante forte', 71: 'Chute de neige légère', 73: 'Chute de neige modérée',
-        75: 'Chute de neige forte', 77: 'Grains de neige', 80: 'Averses de pluie légères',
-        81: 'Averses de pluie modérées', 82: 'Averses de pluie violentes', 85: 'Averses de neige légères',
-        86: 'Averses de neige fortes', 95: 'Orage léger ou modéré', 96: 'Orage avec grêle légère',
-        99: 'Orage avec grêle forte'
-    }
-
-    logging.info("🧠 Normalisation des conditions météo (codes ou texte)...")
+    # La collecte incrémentale peut redemander les derniers jours : on garde la dernière version
+    df = df.drop_duplicates(subset=['datetime', 'Pays', 'Ville'], keep='last')
 
-    def normaliser_condition(val):
-        try:
-            code = int(float(val))
-            return weather_codes.get(code, 'Inconnu')
-        except:
-            return str(val).strip().capitalize() if pd.notnull(val) else 'Inconnu'
+    logging.info("🔢 Conversion des colonnes numériques...")
+    numeric_cols = [col for col in NUMERIC_COLS if col in df.columns]
+    df[numeric_cols] = df[numeric_cols].apply(pd.to_numeric, errors='coerce')
 
-    df['conditions'] = df['conditions'].apply(normaliser_condition)
+    logging.info("🧠 Normalisation des conditions météo (codes ou texte)...")
+    df['conditions'] = normaliser_conditions(df['conditions'])
 
     logging.info("💨 Conversion des vitesses du vent en km/h...")
     df['windspeed'] = df['windspeed'] * 3.6
     df['windgust'] = df['windgust'] * 3.6
 
     logging.info("☁️ Estimation de la couverture nuageuse...")
-    def cloud_cover_from_weathercode(x):
-        if x in ['Ensoleillé', 'Principalement clair']: return 0.2
-        elif x == 'Partiellement nuageux': return 0.5
-        elif x == 'Couvert': return 0.8
-        elif x in ['Brouillard', 'Brouillard givrant']: return 1.0
-        else: return 0.6
-    df['cloudcover'] = df['conditions'].apply(cloud_cover_from_weathercode)
+    df['cloudcover'] = cloud_cover_depuis_conditions(df['conditions'].array)
 
     logging.info("📏 Arrondi des colonnes numériques...")
-    numeric_cols = ['tempmax', 'tempmin', 'temp', 'feelslikemax', 'feelslikemin',
-                    'feelslike', 'dew', 'precip', 'windgust', 'windspeed',
-                    'solarradiation', 'solarenergy', 'uvindex']
-    for col in numeric_cols:
-        if col in df.columns:
-            df[col] = df[col].round(2)
+    df[numeric_cols] = df[numeric_cols].round(2)
 
     cols_order = ['datetime', 'Pays', 'Ville', 'latitude', 'longitude', 'temp', 'tempmax', 'tempmin',
                   'feelslike', 'feelslikemax', 'feelslikemin', 'dew', 'humidity', 'precip',
@@ -69,25 +103,49 @@ def nettoyer_donnees(df):
 
     return df[cols_order]
 
+# === Nettoyage en flux (mémoire bornée par la taille des blocs) ===
+def lire_par_chunks(source, taille, pays=None):
+    """Blocs de `taille` lignes d'un dataset Parquet ou d'un fichier CSV brut."""
+    if isinstance(pays, str):
+        pays = [pays]
+    if str(source).endswith('.csv'):
+        chunks = pd.read_csv(source, chunksize=taille)
+        return (c[c['Pays'].isin(pays)] for c in chunks) if pays else chunks
+    return iterer_parquet(source, taille, pays=pays)
+
+
+def nettoyer_par_chunks(source, destination, taille=None, pays=None):
+    """
+    Nettoie `source` bloc par bloc et écrit chaque bloc nettoyé dans le dataset
+    `destination` au fil de l'eau. Les doublons (datetime, Pays, Ville) sont
+    supprimés dans chaque bloc ; le dataset brut, fusionné à l'écriture, n'en
+    contient pas d'un bloc à l'autre. Avec `pays`, seules les partitions de ces
+    pays sont lues et remplacées (une tâche par pays dans le DAG).
+    Retourne le nombre de lignes écrites.
+    """
+    taille = taille or taille_chunk
+    with EcrivainParquet(destination, pays=pays) as ecrivain:
+        for numero, chunk in enumerate(lire_par_chunks(source, taille, pays), start=1):
+            ecrivain.ecrire(nettoyer_donnees(chunk))
+            logging.info(f"🧹 Bloc {numero} nettoyé ({ecrivain.lignes} lignes au total)")
+    return ecrivain.lignes
+
+
 # === Script principal ===
-if __name__ == "__main__":
+def main(pays=None):
     logging.info("🚀 Début du processus de nettoyage")
 
     try:
-        logging.info(f"📂 Chargement du fichier : {input_csv}")
-        df = pd.read_csv(input_csv)
-        logging.info(f"✅ Fichier chargé avec {len(df)} lignes")
-    except Exception as e:
-        logging.error(f"❌ Erreur lors du chargement du fichier CSV : {e}")
-        exit(1)
-
-    try:
-        logging.info("🧹 Nettoyage en cours...")
-        df_clean = nettoyer_donnees(df)
-        df_clean.to_csv(output_csv, index=False)
-        logging.info(f"✅ Données nettoyées et sauvegardées dans {output_csv}")
+        portee = f" ({', '.join(pays)})" if pays else ""
+        logging.info(f"🧹 Nettoyage de {input_dataset}{portee} par blocs de {taille_chunk} lignes...")
+        lignes = nettoyer_par_chunks(input_dataset, output_dataset, taille_chunk, pays)
+        logging.info(f"✅ {lignes} lignes nettoyées et sauvegardées dans {output_dataset}")
     except Exception as e:
         logging.error(f"❌ Erreur lors du nettoyage : {e}")
         exit(1)
 
     logging.info("🎉 Nettoyage terminé avec succès.")
+
+
+if __name__ == "__main__":
+    main()
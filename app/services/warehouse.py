@@ -0,0 +1,170 @@
+# app/services/warehouse.py
+"""
+Requêtes de lecture sur l'entrepôt : faits_meteo joint à dim_lieu et dim_conditions.
+
+Les filtres portent sur dim_lieu (80 lignes) puis sur l'index
+(id_dim_lieu, datecollect) de faits_meteo : une requête ne lit que les
+observations demandées.
+
+Les gros volumes se lisent par pages (pagination par curseur sur la clé
+(datecollect, id_dim_lieu), sans OFFSET) ou en flux NDJSON/CSV alimenté par
+un curseur serveur : la mémoire par requête reste bornée par la taille d'un lot.
+"""
+import base64
+import csv
+import io
+from datetime import date
+
+from sqlalchemy import text
+
+from app.core.responses import dumps_json
+
+# Colonnes exposées par l'API -> expression SQL
+COLONNES_METEO = {
+    "latitude": "l.latitude",
+    "longitude": "l.longitude",
+    "conditions": "c.conditions",
+    **{col: f"f.{col}" for col in [
+        "temp", "tempmax", "tempmin", "feelslike", "feelslikemax", "feelslikemin",
+        "dew", "precip", "precipcover", "windgust", "windspeed", "winddir",
+        "cloudcover", "solarradiation", "solarenergy", "uvindex"
+    ]},
+}
+COLONNES_CLES = {"datecollect": "f.datecollect", "pays": "l.pays", "ville": "l.ville"}
+# Clé de pagination, retirée des lignes renvoyées
+COLONNE_CURSEUR = "id_dim_lieu"
+TAILLE_LOT_FLUX = 5_000
+
+
+def valider_colonnes(colonnes):
+    """Liste de colonnes demandées (toutes si vide) ; ValueError si inconnue."""
+    if not colonnes:
+        return list(COLONNES_METEO)
+    inconnues = [c for c in colonnes if c not in COLONNES_METEO]
+    if inconnues:
+        raise ValueError(f"Colonnes inconnues : {', '.join(inconnues)} "
+                         f"(disponibles : {', '.join(COLONNES_METEO)})")
+    return list(dict.fromkeys(colonnes))
+
+
+def encoder_curseur(datecollect, id_dim_lieu):
+    """Curseur opaque désignant la dernière ligne d'une page."""
+    brut = f"{datecollect.isoformat()}|{id_dim_lieu}".encode()
+    return base64.urlsafe_b64encode(brut).decode().rstrip("=")
+
+
+def decoder_curseur(curseur):
+    """(datecollect, id_dim_lieu) d'un curseur ; ValueError s'il est invalide."""
+    try:
+        brut = base64.urlsafe_b64decode(curseur + "=" * (-len(curseur) % 4)).decode()
+        jour, id_dim_lieu = brut.split("|")
+        return date.fromisoformat(jour), int(id_dim_lieu)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError(f"Curseur invalide : {curseur}")
+
+
+def construire_requete_meteo(pays=None, ville=None, date_debut=None, date_fin=None,
+                             colonnes=None, limit=None, apres=None):
+    """
+    Requête SQL paramétrée et ses paramètres pour les filtres donnés.
+    `apres` = (datecollect, id_dim_lieu) : ne renvoie que les lignes suivantes
+    dans l'ordre de la clé (pagination par curseur).
+    """
+    selection = {**COLONNES_CLES, **{c: COLONNES_METEO[c] for c in valider_colonnes(colonnes)},
+                 COLONNE_CURSEUR: f"f.{COLONNE_CURSEUR}"}
+    conditions, params = [], {}
+    if pays:
+        conditions.append("lower(l.pays) = lower(:pays)")
+        params["pays"] = pays
+    if ville:
+        conditions.append("lower(l.ville) = lower(:ville)")
+        params["ville"] = ville
+    if date_debut:
+        conditions.append("f.datecollect >= :date_debut")
+        params["date_debut"] = date_debut
+    if date_fin:
+        conditions.append("f.datecollect <= :date_fin")
+        params["date_fin"] = date_fin
+    if apres:
+        conditions.append("(f.datecollect, f.id_dim_lieu) > (:apres_date, :apres_lieu)")
+        params["apres_date"], params["apres_lieu"] = apres
+
+    sql = f"""
+        SELECT {", ".join(f"{expr} AS {nom}" for nom, expr in selection.items())}
+        FROM faits_meteo f
+        JOIN dim_lieu l ON l.id_dim_lieu = f.id_dim_lieu
+        LEFT JOIN dim_conditions c ON c.id_dim_condition = f.id_dim_condition
+        {"WHERE " + " AND ".join(conditions) if conditions else ""}
+        ORDER BY f.datecollect, f.id_dim_lieu
+    """
+    if limit:
+        sql += " LIMIT :limit"
+        params["limit"] = limit
+    return sql, params
+
+
+def _sans_curseur(row):
+    ligne = dict(row)
+    del ligne[COLONNE_CURSEUR]
+    return ligne
+
+
+async def lire_meteo(db, **filtres):
+    """Observations de l'entrepôt (liste de dicts) pour les filtres donnés."""
+    sql, params = construire_requete_meteo(**filtres)
+    result = await db.execute(text(sql), params)
+    return [_sans_curseur(row) for row in result.mappings()]
+
+
+async def lire_page_meteo(db, limit, curseur=None, **filtres):
+    """
+    Page de `limit` observations suivant `curseur`.
+    Retourne (lignes, curseur_suivant) ; curseur_suivant vaut None sur la dernière page.
+    """
+    apres = decoder_curseur(curseur) if curseur else None
+    # Une ligne de plus que demandé indique s'il reste une page
+    sql, params = construire_requete_meteo(limit=limit + 1, apres=apres, **filtres)
+    rows = (await db.execute(text(sql), params)).mappings().all()
+    suivant = None
+    if len(rows) > limit:
+        dernier = rows[limit - 1]
+        suivant = encoder_curseur(dernier["datecollect"], dernier[COLONNE_CURSEUR])
+    return [_sans_curseur(row) for row in rows[:limit]], suivant
+
+
+async def iterer_meteo(session_factory, taille_lot=TAILLE_LOT_FLUX, **filtres):
+    """
+    Lots d'observations lus par un curseur serveur dans une session dédiée
+    (la session de la requête est déjà fermée quand la réponse est envoyée).
+    """
+    sql, params = construire_requete_meteo(**filtres)
+    async with session_factory() as session:
+        result = await session.stream(
+            text(sql).execution_options(yield_per=taille_lot), params)
+        async for lot in result.mappings().partitions(taille_lot):
+            yield [_sans_curseur(row) for row in lot]
+
+
+def en_colonnes(lignes, colonnes):
+    """Lignes (liste de dicts) -> JSON colonnaire {colonne: [valeurs]}."""
+    return {col: [ligne[col] for ligne in lignes] for col in colonnes}
+
+
+async def flux_ndjson(lots):
+    """Une ligne JSON par observation, un morceau envoyé par lot."""
+    async for lot in lots:
+        yield b"".join(dumps_json(ligne) + b"\n" for ligne in lot)
+
+
+async def flux_csv(lots, colonnes):
+    """CSV avec en-tête (`colonnes`), un morceau envoyé par lot."""
+    tampon = io.StringIO()
+    writer = csv.DictWriter(tampon, fieldnames=colonnes)
+    writer.writeheader()
+    async for lot in lots:
+        writer.writerows(lot)
+        yield tampon.getvalue()
+        tampon.seek(0)
+        tampon.truncate()
+    if tampon.tell():
+        yield tampon.getvalue()
@@ -0,0 +1,165 @@
+# app/services/watermark.py
+"""
+Collecte incrémentale : mémorise, pour chaque (Pays, Ville), la dernière date
+collectée afin de ne demander à l'API que la plage manquante.
+
+Plusieurs collectes (une par pays dans le DAG) peuvent partager le fichier :
+chacune n'y réécrit que les pays qu'elle a modifiés, sous verrou.
+"""
+import json
+import logging
+import os
+from contextlib import contextmanager
+from datetime import date, timedelta
+from pathlib import Path
+
+from app.core.config import settings
+from app.services.openmeteo import collecter_villes
+
+try:
+    import fcntl
+except ImportError:   # Windows : pas de verrou, une seule collecte à la fois
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def _verrou_fichier(chemin):
+    """Verrou exclusif inter-processus sur `chemin`.lock (sans effet sous Windows)."""
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    with open(chemin.with_name(chemin.name + ".lock"), "w") as verrou:
+        if fcntl:
+            fcntl.flock(verrou, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(verrou, fcntl.LOCK_UN)
+
+
+class WatermarkStore:
+    """Dernière date collectée par (Pays, Ville), persistée dans un fichier JSON."""
+
+    def __init__(self, chemin=None):
+        self.chemin = Path(chemin or settings.WATERMARK_PATH)
+        self._marques = self._lire()
+        self._modifies = set()
+
+    def _lire(self):
+        if not self.chemin.exists():
+            return {}
+        with open(self.chemin, encoding="utf-8") as f:
+            return json.load(f)
+
+    def get(self, pays, ville):
+        """Dernière date collectée (ISO) pour la ville, ou None."""
+        return self._marques.get(pays, {}).get(ville)
+
+    def set(self, pays, ville, jour):
+        """Avance la marque de la ville à `jour` (jamais de recul)."""
+        jour = str(jour)[:10]
+        actuelle = self.get(pays, ville)
+        if actuelle is None or jour > actuelle:
+            self._marques.setdefault(pays, {})[ville] = jour
+            self._modifies.add(pays)
+
+    def reinitialiser(self, pays=None):
+        """Oublie les marques de `pays` (tous par défaut) : collecte complète au prochain passage."""
+        pays = list(self._marques) if pays is None else [pays] if isinstance(pays, str) else pays
+        for p in pays:
+            self._marques.pop(p, None)
+            self._modifies.add(p)
+
+    def mettre_a_jour(self, frames):
+        """
+        Avance les marques à partir des DataFrames collectés. Seules les lignes avec
+        une température sont prises en compte : l'archive publie les derniers jours
+        avec plusieurs jours de retard (valeurs nulles), ils seront redemandés.
+        """
+        for df in frames:
+            mesures = df.dropna(subset=["temp"]) if "temp" in df.columns else df
+            if mesures.empty:
+                continue
+            self.set(df["Pays"].iloc[0], df["Ville"].iloc[0], mesures["datetime"].max())
+
+    def charger_depuis_entrepot(self, conn):
+        """
+        Initialise les marques depuis l'entrepôt (MAX(datecollect) par lieu).
+        Comme dans `mettre_a_jour`, les jours sans température ne comptent pas.
+        """
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT l.pays, l.ville, MAX(f.datecollect)
+                FROM faits_meteo f
+                JOIN dim_lieu l ON l.id_dim_lieu = f.id_dim_lieu
+                WHERE f.temp IS NOT NULL
+                GROUP BY l.pays, l.ville
+            """)
+            for pays, ville, derniere_date in cursor.fetchall():
+                self.set(pays, ville, derniere_date)
+
+    def sauvegarder(self):
+        """
+        Écrit le fichier de marques de façon atomique. Seuls les pays modifiés
+        par ce store y sont remplacés : les marques écrites entre-temps par une
+        autre collecte (autres pays) sont conservées.
+        """
+        with _verrou_fichier(self.chemin):
+            marques = self._lire()
+            for pays in self._modifies:
+                if pays in self._marques:
+                    marques[pays] = self._marques[pays]
+                else:
+                    marques.pop(pays, None)
+            tmp = self.chemin.with_suffix(self.chemin.suffix + f".{os.getpid()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(marques, f, ensure_ascii=False, indent=2, sort_keys=True)
+            os.replace(tmp, self.chemin)
+        self._marques = marques
+        self._modifies = set()
+
+
+def plages_manquantes(villes, store, start_date, end_date):
+    """
+    Regroupe les villes par date de début à demander (lendemain de leur marque,
+    ou `start_date`). Les villes déjà à jour sont ignorées.
+    Retourne {date_debut: [villes]}.
+    """
+    groupes = {}
+    for ville_info in villes:
+        debut = start_date
+        marque = store.get(ville_info["pays"], ville_info["ville"])
+        if marque:
+            debut = max(start_date, (date.fromisoformat(marque) + timedelta(days=1)).isoformat())
+        if debut > end_date:
+            continue
+        groupes.setdefault(debut, []).append(ville_info)
+    return groupes
+
+
+def collecter_incremental(villes, start_date, end_date, store=None, sauvegarder=True, **options):
+    """
+    Collecte uniquement les jours manquants de chaque ville puis avance et
+    sauvegarde les marques. Avec `sauvegarder=False`, les marques sont laissées
+    à l'appelant (à avancer une fois les données persistées).
+    Mêmes valeurs de retour que `collecter_villes`.
+    """
+    store = store or WatermarkStore()
+    groupes = plages_manquantes(villes, store, start_date, end_date)
+    a_jour = len(villes) - sum(len(g) for g in groupes.values())
+    logger.info(f"📌 {a_jour} ville(s) déjà à jour, {len(groupes)} plage(s) à collecter")
+    if options.get("progression"):
+        options["progression"](a_jour)
+
+    frames, echecs = [], []
+    for debut, groupe in sorted(groupes.items()):
+        logger.info(f"🔄 {len(groupe)} ville(s) du {debut} au {end_date}")
+        frames_groupe, echecs_groupe = collecter_villes(groupe, debut, end_date, **options)
+        frames += frames_groupe
+        echecs += echecs_groupe
+
+    if sauvegarder:
+        store.mettre_a_jour(frames)
+        store.sauvegarder()
+    return frames, echecs
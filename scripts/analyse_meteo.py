@@ -3,14 +3,20 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 import os
+import sys
 import logging
+from pathlib import Path
 from datetime import datetime
-from sklearn.cluster import KMeans
 from sklearn.linear_model import LinearRegression
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_squared_error, r2_score
 from scipy import stats
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.core.config import settings
+from app.services.clustering import balayer_k
+from app.services.storage import lire_parquet
+
 # ====================
 # CONFIGURATION INITIALE
 # ====================
@@ -26,10 +32,16 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Création du dossier de résultats
+# Dossier de résultats (créé dans main : les workers du clustering réimportent ce script)
 OUTPUT_DIR = f"resultats_meteo_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-logger.info(f"Dossier de résultats créé : {OUTPUT_DIR}")
+
+# Clustering K-Means : valeurs de k de la méthode du coude, k retenu,
+# processus parallèles (None = un par cœur), MiniBatchKMeans (None = selon le volume)
+K_COUDE = range(1, 11)
+K_RETENU = 3
+NB_PROCESSUS = None
+MINI_BATCH = None
+ECHANTILLON_TRACE = 50_000   # points affichés sur le nuage des clusters
 
 # Configuration des graphiques
 def configurer_graphiques():
@@ -52,11 +64,14 @@ configurer_graphiques()
 # CHARGEMENT DES DONNÉES
 # ====================
 
+COLONNES_ANALYSE = ['datetime', 'Pays', 'Ville', 'temp', 'tempmax', 'tempmin',
+                    'precip', 'latitude', 'longitude']
+
 def charger_donnees(chemin):
-    """Charge et nettoie les données météo"""
+    """Charge et nettoie les données météo (dataset Parquet, colonnes utiles uniquement)"""
     try:
         logger.info(f"Chargement des données depuis {chemin}")
-        df = pd.read_csv(chemin, parse_dates=['datetime'])
+        df = lire_parquet(chemin, colonnes=COLONNES_ANALYSE)
         
         # Renommage des colonnes
         df = df.rename(columns={
@@ -182,33 +197,30 @@ def appliquer_ml(df):
     
     # 1. Clustering K-Means
     logger.info("\nClustering K-Means")
-    X_cluster = df[['Température', 'Précipitations']].values
+    X_cluster = df[['Température', 'Précipitations']].to_numpy(dtype='float64')
     
-    # Méthode du coude
-    wcss = []
-    for i in range(1, 11):
-        kmeans = KMeans(n_clusters=i, init='k-means++', random_state=42)
-        kmeans.fit(X_cluster)
-        wcss.append(kmeans.inertia_)
+    # Méthode du coude : un modèle par k, ajustés en parallèle
+    modeles = balayer_k(X_cluster, K_COUDE, mini_batch=MINI_BATCH, nb_processus=NB_PROCESSUS)
+    wcss = [modeles[k].inertia_ for k in K_COUDE]
     
     fig5, ax5 = plt.subplots()
-    ax5.plot(range(1, 11), wcss, marker='o', linestyle='--')
+    ax5.plot(list(K_COUDE), wcss, marker='o', linestyle='--')
     ax5.set_title('Méthode du Coude pour Déterminer k Optimal')
     ax5.set_xlabel('Nombre de clusters')
     ax5.set_ylabel('WCSS')
     afficher_et_sauvegarder(fig5, "methode_coude")
     
-    # Clustering avec k=3
-    kmeans = KMeans(n_clusters=3, init='k-means++', random_state=42)
-    clusters = kmeans.fit_predict(X_cluster)
-    df['Cluster'] = clusters
+    # Clustering avec k=3 : modèle déjà ajusté pendant la méthode du coude
+    kmeans = modeles[K_RETENU]
+    df['Cluster'] = kmeans.predict(X_cluster)
+    df_trace = df.sample(n=min(len(df), ECHANTILLON_TRACE), random_state=42)
     
     fig6, ax6 = plt.subplots()
-    sns.scatterplot(data=df, x='Température', y='Précipitations', 
+    sns.scatterplot(data=df_trace, x='Température', y='Précipitations', 
                     hue='Cluster', palette='viridis', s=100, alpha=0.7, ax=ax6)
     ax6.scatter(kmeans.cluster_centers_[:, 0], kmeans.cluster_centers_[:, 1], 
                 s=300, c='red', marker='X', label='Centroïdes')
-    ax6.set_title("Clustering des Conditions Météorologiques (K=3)")
+    ax6.set_title(f"Clustering des Conditions Météorologiques (K={K_RETENU})")
     ax6.set_xlabel("Température (°C)")
     ax6.set_ylabel("Précipitations (mm)")
     ax6.legend(title='Cluster')
@@ -253,9 +265,11 @@ def appliquer_ml(df):
 # ====================
 
 def main():
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    logger.info(f"Dossier de résultats créé : {OUTPUT_DIR}")
     try:
         # Chargement des données
-        df = charger_donnees("/Users/NOKHO/Desktop/Meteo/historique_meteo_uemoa_80villes_clean.csv")
+        df = charger_donnees(settings.CLEAN_DATASET_DIR)
         
         # Analyses
         analyser_donnees(df)
@@ -5,43 +5,39 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import os
+import sys
+from pathlib import Path
 from datetime import datetime as dt
+from urllib.parse import urlencode
+from flask import Response, abort, request, stream_with_context
 
-# Configuration des données
-DATA_CSV_PATH = "/Users/NOKHO/Desktop/Meteo/historique_meteo_uemoa_80villes_clean.csv"
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.core.config import settings
+from app.core.villes import REGISTRE
+from app.services.dashboard import SourceDashboard
+from app.services.decimation import LTTB, MINMAX, decimer
+from app.services.export import disposition_piece_jointe, exporter
 
-# Vérification et chargement des données
-if os.path.exists(DATA_CSV_PATH):
-    df = pd.read_csv(DATA_CSV_PATH, parse_dates=['datetime'])
-else:
-    raise FileNotFoundError(f"Le fichier de données n'a pas été trouvé : {DATA_CSV_PATH}")
+# Couche de requêtes sur le dataset Parquet nettoyé : aucun DataFrame global,
+# chaque callback lit une série filtrée ou agrégée
+source = SourceDashboard()
 
-# Préparation des données - Utilisation des noms de colonnes exacts du CSV
-df = df.rename(columns={
-    'datetime': 'Date',
-    'temp': 'Température (°C)',
-    'precip': 'Précipitations (mm)',
-    'windspeed': 'Vent (km/h)',
-    'winddir': 'Direction Vent (°)',
-    'cloudcover': 'Couverture Nuageuse',
-    'conditions': 'Conditions'
-})
-
-# Colonnes à conserver (avec les noms exacts du CSV)
-cols_utiles = [
+# Colonnes de la table (libellés affichés)
+cols_disponibles = [
     'Date', 'Pays', 'Ville', 'latitude', 'longitude',
     'Température (°C)', 'Précipitations (mm)', 'Vent (km/h)',
     'Direction Vent (°)', 'Couverture Nuageuse', 'Conditions'
 ]
 
-# Vérification que les colonnes existent bien
-cols_disponibles = [col for col in cols_utiles if col in df.columns]
-df = df[cols_disponibles]
-
-# Variables globales
-date_debut = df['Date'].min().date()
-date_fin = df['Date'].max().date()
-pays_disponibles = sorted(df['Pays'].unique())
+# Variables globales (inventaire léger : bornes de dates par ville)
+inventaire = source.inventaire()
+if inventaire.empty:
+    raise ValueError(f"Aucune ville du référentiel dans le dataset : {source.dossier}")
+date_debut = inventaire['debut'].min().date()
+date_fin = inventaire['fin'].max().date()
+ids_presents = set(inventaire['id_ville'].tolist())
+pays_disponibles = [p for p in REGISTRE.pays
+                    if any(v.id in ids_presents for v in REGISTRE.villes_du_pays(p))]
 
 # Initialisation de l'app Dash
 app = dash.Dash(__name__, 
@@ -139,7 +135,13 @@ app.layout = dbc.Container([
                     dash_table.DataTable(
                         id='table-donnees',
                         columns=[{"name": col, "id": col} for col in cols_disponibles],
+                        # Pagination et tri côté serveur : seule la page affichée est envoyée
+                        page_current=0,
                         page_size=10,
+                        page_action='custom',
+                        sort_action='custom',
+                        sort_mode='single',
+                        sort_by=[],
                         style_table={'overflowX': 'auto'},
                         style_cell={
                             'textAlign': 'left',
@@ -155,11 +157,13 @@ app.layout = dbc.Container([
             
             dbc.Row([
                 dbc.Col([
-                    dbc.Button("📥 Exporter CSV", id="btn-export", color="success", className="me-2"),
+                    # Liens vers /export : le fichier est envoyé en flux par le serveur
+                    dbc.Button("📥 Exporter CSV", id="btn-export", color="success", className="me-2",
+                               external_link=True),
+                    dbc.Button("📥 Exporter Parquet", id="btn-export-parquet", color="secondary",
+                               external_link=True),
                 ], md=12, className="text-end")
             ]),
-            
-            dcc.Download(id="download-dataframe-csv")
         ], md=9)
     ], className="mt-3"),
     
@@ -178,8 +182,8 @@ app.layout = dbc.Container([
     Input("dropdown-pays", "value")
 )
 def update_villes(pays):
-    villes = df[df["Pays"] == pays]["Ville"].unique()
-    options = [{"label": v, "value": v} for v in sorted(villes)]
+    villes = [v for v in REGISTRE.villes_du_pays(pays) if v.id in ids_presents]
+    options = [{"label": v.ville, "value": v.id} for v in sorted(villes, key=lambda v: v.ville)]
     valeur = options[0]["value"] if options else None
     return options, valeur
 
@@ -191,7 +195,6 @@ def update_villes(pays):
     Output("graph-precip", "figure"),
     Output("graph-vent", "figure"),
     Output("carte-meteo", "figure"),
-    Output("table-donnees", "data"),
     Output("alertes-meteo", "children"),
     Input("btn-refresh", "n_clicks"),
     State("dropdown-pays", "value"),
@@ -199,16 +202,44 @@ def update_villes(pays):
     State("date-range", "start_date"),
     State("date-range", "end_date")
 )
-def update_dashboard(n_clicks, pays, ville, start_date, end_date):
+def update_dashboard(n_clicks, pays, id_ville, start_date, end_date):
     start = pd.to_datetime(start_date)
     end = pd.to_datetime(end_date)
+    # Vue complète (indicateurs, figures, alertes) mémorisée par sélection
+    # et version du dataset : une sélection déjà vue n'est pas recalculée
+    sorties, _ = source.memoiser("vue", (pays, id_ville, start, end),
+                                 lambda: calculer_vue(pays, id_ville, start, end),
+                                 taille=lambda vue: vue[1])
+    return sorties
+
+# Estimation de la taille des figures en cache (octets)
+SERIES_TRACE = ("x", "y", "lat", "lon", "text", "hovertext", "customdata")
+OCTETS_PAR_VALEUR = 24
+OCTETS_PAR_FIGURE = 4096
+
+def courbe(dff, colonne, titre, methode=LTTB):
+    """Courbe de `colonne` dans le temps, avec au plus DASH_POINTS_GRAPHE points."""
+    points = decimer(dff, "Date", colonne, settings.DASH_POINTS_GRAPHE, methode)
+    if len(points) < dff[colonne].notna().sum():
+        titre += f" ({len(points)} points sur {dff[colonne].notna().sum()})"
+    return px.line(points, x="Date", y=colonne, title=titre)
+
+def taille_vue(figures, dff):
+    """
+    Taille approximative d'une vue en cache, estimée sans sérialiser les figures :
+    nombre de valeurs de leurs traces, mise en page et tranche de la table.
+    """
+    valeurs = sum(len(serie) for fig in figures for trace in fig.data
+                  for serie in (getattr(trace, nom, None) for nom in SERIES_TRACE)
+                  if serie is not None and not isinstance(serie, str))
+    return (valeurs * OCTETS_PAR_VALEUR + len(figures) * OCTETS_PAR_FIGURE
+            + int(dff.memory_usage(deep=True).sum()))
+
+def calculer_vue(pays, id_ville, start, end):
+    """Sorties du callback principal pour une sélection, et leur taille approximative."""
+    ville = REGISTRE.par_id(id_ville).ville if id_ville is not None else None
     
-    dff = df[
-        (df["Pays"] == pays) &
-        (df["Ville"] == ville) &
-        (df["Date"] >= start) &
-        (df["Date"] <= end)
-    ]
+    dff = source.serie(id_ville, start, end) if id_ville is not None else pd.DataFrame()
     
     if dff.empty:
         temp_moy = precip_total = vent_moy = "N/A"
@@ -236,9 +267,10 @@ def update_dashboard(n_clicks, pays, ville, start_date, end_date):
         fig_map.update_layout(mapbox_style="open-street-map")
         
         alertes = dbc.Alert("⚠️ Aucune donnée disponible pour cette sélection.", color="warning")
+        figures = [fig_temp, fig_precip, fig_vent, fig_map]
         return [temp_moy, precip_total, vent_moy, 
                 fig_temp, fig_precip, fig_vent, 
-                fig_map, [], alertes]
+                fig_map, alertes], taille_vue(figures, dff)
     
     # Calcul des indicateurs
     temp_moy_val = dff['Température (°C)'].mean()
@@ -249,20 +281,13 @@ def update_dashboard(n_clicks, pays, ville, start_date, end_date):
     precip_total = f"{precip_total_val:.1f} mm"
     vent_moy = f"{vent_moy_val:.1f} km/h"
     
-    # Création des graphiques
-    fig_temp = px.line(dff, x="Date", y="Température (°C)", title=f'Température à {ville}')
-    fig_precip = px.line(dff, x="Date", y="Précipitations (mm)", title=f'Précipitations à {ville}')
-    fig_vent = px.line(dff, x="Date", y="Vent (km/h)", title=f'Vitesse du vent à {ville}')
+    # Création des graphiques (séries réduites à la largeur d'un graphique sur les longues périodes)
+    fig_temp = courbe(dff, "Température (°C)", f'Température à {ville}')
+    fig_precip = courbe(dff, "Précipitations (mm)", f'Précipitations à {ville}', methode=MINMAX)
+    fig_vent = courbe(dff, "Vent (km/h)", f'Vitesse du vent à {ville}')
     
     # Carte
-    df_map = df[
-        (df["Pays"] == pays) &
-        (df["Date"] >= start) &
-        (df["Date"] <= end)
-    ].groupby(["Ville", "latitude", "longitude"]).agg({
-        'Température (°C)': 'mean',
-        'Précipitations (mm)': 'sum'
-    }).reset_index()
+    df_map = source.carte(pays, start, end)
     
     if not df_map.empty:
         fig_map = px.scatter_mapbox(
@@ -301,41 +326,78 @@ def update_dashboard(n_clicks, pays, ville, start_date, end_date):
     else:
         alertes = dbc.Alert("✅ Aucune alerte météo", color="success")
     
-    # Préparation des données pour la table
-    table_data = dff[cols_disponibles].to_dict('records')
-    
+    figures = [fig_temp, fig_precip, fig_vent, fig_map]
     return [temp_moy, precip_total, vent_moy,
             fig_temp, fig_precip, fig_vent,
-            fig_map, table_data, alertes]
+            fig_map, alertes], taille_vue(figures, dff)
 
 @app.callback(
-    Output("download-dataframe-csv", "data"),
-    Input("btn-export", "n_clicks"),
-    State("dropdown-pays", "value"),
+    Output("table-donnees", "data"),
+    Output("table-donnees", "page_count"),
+    Output("table-donnees", "page_current"),
+    Input("btn-refresh", "n_clicks"),
+    Input("table-donnees", "page_current"),
+    Input("table-donnees", "page_size"),
+    Input("table-donnees", "sort_by"),
     State("dropdown-ville", "value"),
     State("date-range", "start_date"),
-    State("date-range", "end_date"),
-    prevent_initial_call=True
+    State("date-range", "end_date")
 )
-def export_csv(n_clicks, pays, ville, start_date, end_date):
+def update_table(n_clicks, page_current, page_size, sort_by, id_ville, start_date, end_date):
+    if id_ville is None:
+        return [], 0, 0
     start = pd.to_datetime(start_date)
     end = pd.to_datetime(end_date)
-    
-    dff = df[
-        (df["Pays"] == pays) &
-        (df["Ville"] == ville) &
-        (df["Date"] >= start) &
-        (df["Date"] <= end)
-    ]
-    
-    if dff.empty:
-        return dash.no_update
-    
-    return dcc.send_data_frame(
-        dff.to_csv,
-        filename=f"meteo_{ville}_{start.date()}_to_{end.date()}.csv",
-        index=False
-    )
+    tri = tuple((s["column_id"], s["direction"] == "asc") for s in sort_by or [])
+    # Nouvelle sélection : retour à la première page
+    declencheurs = [t["prop_id"] for t in dash.callback_context.triggered]
+    page_current = 0 if "btn-refresh.n_clicks" in declencheurs else page_current or 0
+
+    def lire_page(numero):
+        def calculer_page():
+            dff = source.serie(id_ville, start, end)
+            if tri:
+                dff = dff.sort_values([c for c, _ in tri], ascending=[a for _, a in tri], kind="stable")
+            page = dff.iloc[numero * page_size:(numero + 1) * page_size]
+            return page[cols_disponibles].to_dict('records'), -(-len(dff) // page_size)
+
+        # Seule la page demandée est envoyée au navigateur
+        return source.memoiser("table", (id_ville, start, end, tri, numero, page_size), calculer_page,
+                               taille=lambda page: len(str(page[0])))
+
+    donnees, nb_pages = lire_page(page_current)
+    if page_current >= nb_pages > 0:
+        # Page au-delà de la fin de la sélection : dernière page
+        page_current = nb_pages - 1
+        donnees, nb_pages = lire_page(page_current)
+    return donnees, nb_pages, page_current
+
+@app.callback(
+    Output("btn-export", "href"),
+    Output("btn-export-parquet", "href"),
+    Input("dropdown-ville", "value"),
+    Input("date-range", "start_date"),
+    Input("date-range", "end_date")
+)
+def update_liens_export(id_ville, start_date, end_date):
+    if id_ville is None:
+        return None, None
+    periode = urlencode({"debut": start_date, "fin": end_date})
+    return f"/export/{id_ville}.csv?{periode}", f"/export/{id_ville}.parquet?{periode}"
+
+@app.server.route("/export/<int:id_ville>.<format>")
+def export_ville(id_ville, format):
+    """Export en flux (service d'export partagé avec l'API) de la ville sur la période demandée."""
+    if id_ville not in ids_presents or format not in ("csv", "parquet"):
+        abort(404)
+    ville = REGISTRE.par_id(id_ville)
+    start = pd.to_datetime(request.args.get("debut") or date_debut)
+    end = pd.to_datetime(request.args.get("fin") or date_fin)
+    flux, type_mime = exporter(format, dossier=source.dossier, pays=ville.pays, villes=ville.ville,
+                               date_debut=start, date_fin=end)
+    nom = f"meteo_{ville.ville}_{start.date()}_to_{end.date()}.{format}"
+    return Response(stream_with_context(flux), mimetype=type_mime,
+                    headers={"Content-Disposition": disposition_piece_jointe(nom)})
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=8050)
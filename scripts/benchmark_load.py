@@ -0,0 +1,96 @@
+"""
+Benchmark du chargement de faits_meteo (app/services/load.py) :
+ancienne méthode `execute_batch` contre COPY vers la staging + fusion ensembliste.
+
+Les deux méthodes écrivent dans une table temporaire `faits_meteo` (pg_temp,
+prioritaire dans le search_path) : la vraie table de l'entrepôt n'est pas modifiée.
+Chaque méthode est mesurée deux fois : insertion dans une table vide, puis
+mise à jour de toutes les lignes (conflits ON CONFLICT).
+
+Usage : python scripts/benchmark_load.py [--dsn postgresql://...] [--annees 5]
+"""
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import psycopg2
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.services.load import (
+    COLONNES_FAITS, DB_CONFIG, MESURES, charger_faits_copy, charger_faits_execute_batch,
+)
+
+logging.disable(logging.INFO)
+
+
+def generer_faits(nb_lieux=80, annees=5, seed=42):
+    """Faits synthétiques déjà préparés (clés de dimensions résolues)."""
+    rng = np.random.default_rng(seed)
+    jours = pd.date_range("2020-01-01", periods=365 * annees, freq="D")
+    n = nb_lieux * len(jours)
+    df = pd.DataFrame({
+        "datecollect": np.tile(jours, nb_lieux),
+        "id_dim_lieu": np.repeat(np.arange(1, nb_lieux + 1), len(jours)),
+        "id_dim_condition": rng.integers(1, 20, n),
+    })
+    for col in MESURES:
+        df[col] = rng.normal(25, 5, n).round(2)
+    return df[COLONNES_FAITS]
+
+
+def creer_table_temporaire(conn):
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            CREATE TEMP TABLE faits_meteo (
+                datecollect DATE NOT NULL,
+                id_dim_lieu INTEGER NOT NULL,
+                id_dim_condition INTEGER,
+                {", ".join(f"{col} DOUBLE PRECISION" for col in MESURES)},
+                PRIMARY KEY (datecollect, id_dim_lieu)
+            )
+        """)
+    conn.commit()
+
+
+def chronometrer(conn, fonction, donnees):
+    debut = time.perf_counter()
+    fonction(conn, donnees)
+    conn.commit()
+    return time.perf_counter() - debut
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dsn", help="chaîne de connexion PostgreSQL (par défaut DB_CONFIG)")
+    parser.add_argument("--lieux", type=int, default=80)
+    parser.add_argument("--annees", type=int, default=5)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(args.dsn) if args.dsn else psycopg2.connect(**DB_CONFIG)
+    try:
+        creer_table_temporaire(conn)
+        df_faits = generer_faits(args.lieux, args.annees)
+        n = len(df_faits)
+        print(f"📊 {n:,} faits ({args.lieux} lieux × {args.annees} ans)")
+
+        for nom, fonction, donnees in [
+            ("execute_batch", charger_faits_execute_batch, df_faits),
+            ("COPY + fusion", charger_faits_copy, df_faits),
+        ]:
+            with conn.cursor() as cursor:
+                cursor.execute("TRUNCATE faits_meteo")
+            conn.commit()
+            insertion = chronometrer(conn, fonction, donnees)
+            mise_a_jour = chronometrer(conn, fonction, donnees)
+            print(f"⏱️ {nom:<14} insertion : {insertion:6.2f} s ({n / insertion:>10,.0f} lignes/s)"
+                  f"   mise à jour : {mise_a_jour:6.2f} s ({n / mise_a_jour:>10,.0f} lignes/s)")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark de la sérialisation des réponses de /api/v1/meteo :
+une année complète pour 80 villes (≈ 29 000 observations, toutes les colonnes).
+
+Compare l'ancien chemin (jsonable_encoder + json de la bibliothèque standard)
+à orjson, par lignes et par colonnes, puis la taille des charges utiles
+brute, gzip et Brotli (niveaux utilisés par le middleware).
+
+Usage : python scripts/benchmark_serialisation.py [--villes 80] [--jours 365] [--repetitions 5]
+"""
+import argparse
+import gzip
+import json
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import brotli
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.core.config import settings
+from app.core.responses import dumps_json
+from app.services.warehouse import COLONNES_CLES, COLONNES_METEO, en_colonnes
+
+
+def generer_reponse(nb_villes=80, jours=365, seed=42):
+    """Lignes au format de lire_page_meteo (dates et flottants comme renvoyés par asyncpg)."""
+    rng = np.random.default_rng(seed)
+    debut = date(2024, 1, 1)
+    mesures = [col for col in COLONNES_METEO if col not in ("conditions",)]
+    lignes = []
+    for j in range(jours):
+        jour = debut + timedelta(days=j)
+        for v in range(nb_villes):
+            ligne = {"datecollect": jour, "pays": f"Pays {v // 10}", "ville": f"Ville {v}"}
+            ligne.update({col: float(x) for col, x in zip(mesures, rng.normal(25, 5, len(mesures)))})
+            ligne["conditions"] = "Partiellement nuageux"
+            lignes.append(ligne)
+    return lignes
+
+
+def chronometrer(fonction, contenu, repetitions):
+    meilleur = float("inf")
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        corps = fonction(contenu)
+        meilleur = min(meilleur, time.perf_counter() - debut)
+    return meilleur, corps
+
+
+def json_standard(contenu):
+    """Ancien chemin : JSONResponse par défaut de FastAPI."""
+    return json.dumps(jsonable_encoder(contenu), ensure_ascii=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--villes", type=int, default=80)
+    parser.add_argument("--jours", type=int, default=365)
+    parser.add_argument("--repetitions", type=int, default=5)
+    args = parser.parse_args()
+
+    lignes = generer_reponse(args.villes, args.jours)
+    colonnes = en_colonnes(lignes, [*COLONNES_CLES, *COLONNES_METEO])
+    print(f"📊 {len(lignes):,} observations ({args.villes} villes × {args.jours} jours)")
+
+    reference = None
+    for nom, fonction, contenu in [
+        ("json + jsonable_encoder", json_standard, lignes),
+        ("orjson (lignes)", dumps_json, lignes),
+        ("orjson (colonnes)", dumps_json, colonnes),
+    ]:
+        duree, corps = chronometrer(fonction, contenu, args.repetitions)
+        reference = reference or duree
+        t_gzip, gz = chronometrer(lambda c: gzip.compress(c, compresslevel=9), corps, 1)
+        t_br, br = chronometrer(lambda c: brotli.compress(c, quality=settings.API_BROTLI_QUALITY), corps, 1)
+        print(f"⏱️ {nom:<24} {duree * 1000:8.1f} ms (×{reference / duree:4.1f})"
+              f"   brut {len(corps) / 1e6:6.2f} Mo"
+              f"   gzip {len(gz) / 1e6:5.2f} Mo ({t_gzip * 1000:5.0f} ms)"
+              f"   brotli {len(br) / 1e6:5.2f} Mo ({t_br * 1000:5.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark du nettoyage (app/services/transform.py) sur un jeu synthétique :
+80 villes × plusieurs décennies de jours (≈ 2 millions de lignes par défaut).
+
+Compare le moteur vectorisé (`nettoyer_donnees`) à l'ancienne normalisation
+ligne à ligne (`apply`), mesurée sur un échantillon puis extrapolée.
+
+Usage : python scripts/benchmark_transform.py [--annees 70] [--echantillon 200000]
+"""
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.services.transform import (
+    WEATHER_CODES, cloud_cover_depuis_conditions, nettoyer_donnees, normaliser_conditions,
+)
+
+logging.disable(logging.INFO)
+
+
+def generer_donnees(nb_villes=80, annees=70, seed=42):
+    """Jeu brut synthétique au format du collecteur (codes météo numériques)."""
+    rng = np.random.default_rng(seed)
+    jours = pd.date_range("1955-01-01", periods=365 * annees, freq="D")
+    n = nb_villes * len(jours)
+    codes = np.array(list(WEATHER_CODES) + [np.nan], dtype="float64")
+    return pd.DataFrame({
+        "datetime": np.tile(jours.strftime("%Y-%m-%d"), nb_villes),
+        "Pays": np.repeat([f"Pays {i // 10}" for i in range(nb_villes)], len(jours)),
+        "Ville": np.repeat([f"Ville {i}" for i in range(nb_villes)], len(jours)),
+        "latitude": np.repeat(rng.uniform(5, 20, nb_villes), len(jours)),
+        "longitude": np.repeat(rng.uniform(-17, 4, nb_villes), len(jours)),
+        **{col: rng.normal(28, 5, n) for col in [
+            "temp", "tempmax", "tempmin", "feelslike", "feelslikemax", "feelslikemin", "dew"]},
+        "precip": rng.exponential(2, n),
+        "precipcover": rng.uniform(0, 24, n),
+        "windgust": rng.uniform(0, 20, n),
+        "windspeed": rng.uniform(0, 15, n),
+        "winddir": rng.uniform(0, 360, n),
+        "solarradiation": rng.uniform(0, 40000, n),
+        "solarenergy": rng.uniform(0, 30, n),
+        "uvindex": rng.uniform(0, 8, n),
+        "conditions": rng.choice(codes, n),
+    })
+
+
+def normalisation_ligne_a_ligne(df):
+    """Ancienne implémentation : deux `apply` Python par ligne."""
+    def normaliser_condition(val):
+        try:
+            code = int(float(val))
+            return WEATHER_CODES.get(code, 'Inconnu')
+        except (TypeError, ValueError):
+            return str(val).strip().capitalize() if pd.notnull(val) else 'Inconnu'
+
+    def cloud_cover_from_weathercode(x):
+        if x in ['Ensoleillé', 'Principalement clair']: return 0.2
+        elif x == 'Partiellement nuageux': return 0.5
+        elif x == 'Couvert': return 0.8
+        elif x in ['Brouillard', 'Brouillard givrant']: return 1.0
+        else: return 0.6
+
+    conditions = df['conditions'].apply(normaliser_condition)
+    return conditions.apply(cloud_cover_from_weathercode)
+
+
+def normalisation_vectorisee(df):
+    """Nouvelle implémentation : correspondance sur les valeurs distinctes puis codes."""
+    return cloud_cover_depuis_conditions(normaliser_conditions(df['conditions']))
+
+
+def chronometrer(fonction, *args):
+    debut = time.perf_counter()
+    fonction(*args)
+    return time.perf_counter() - debut
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--villes", type=int, default=80)
+    parser.add_argument("--annees", type=int, default=70)
+    parser.add_argument("--echantillon", type=int, default=200_000,
+                        help="lignes utilisées pour mesurer l'ancienne version (0 pour l'ignorer)")
+    args = parser.parse_args()
+
+    df = generer_donnees(args.villes, args.annees)
+    n = len(df)
+    print(f"📊 Jeu synthétique : {n:,} lignes ({args.villes} villes × {args.annees} ans)")
+
+    duree = chronometrer(nettoyer_donnees, df.copy())
+    print(f"⚡ nettoyer_donnees vectorisé : {duree:.2f} s  ({n / duree:,.0f} lignes/s)")
+
+    duree_vect = chronometrer(normalisation_vectorisee, df)
+    print(f"⚡ conditions + cloudcover vectorisés : {duree_vect:.3f} s  ({n / duree_vect:,.0f} lignes/s)")
+
+    if args.echantillon:
+        echantillon = df.head(args.echantillon)
+        duree_apply = chronometrer(normalisation_ligne_a_ligne, echantillon)
+        debit_apply = len(echantillon) / duree_apply
+        print(f"🐢 conditions + cloudcover par apply : {debit_apply:,.0f} lignes/s "
+              f"(≈ {n / debit_apply:.2f} s extrapolées, soit ×{n / debit_apply / duree_vect:.0f})")
+
+
+if __name__ == "__main__":
+    main()
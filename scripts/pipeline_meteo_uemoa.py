@@ -1,6 +1,27 @@
 from airflow import DAG
 from airflow.operators.bash import BashOperator
+from airflow.utils.task_group import TaskGroup
+from airflow.utils.trigger_rule import TriggerRule
 from datetime import datetime, timedelta
+from pathlib import Path
+import csv
+import shlex
+import unicodedata
+
+PYTHON = '/Users/NOKHO/Desktop/Meteo/airflow_venv/bin/python3'
+SCRIPTS = '/Users/NOKHO/Desktop/Meteo'
+# Référentiel des villes, au même endroit que pour les scripts (app/ à côté du dossier des scripts)
+FICHIER_VILLES = Path(SCRIPTS).parent / 'app' / 'core' / 'villes_uemoa.csv'
+
+
+def lire_pays(chemin=FICHIER_VILLES):
+    """Pays du référentiel, sans doublon, dans l'ordre du fichier."""
+    with open(chemin, encoding='utf-8', newline='') as f:
+        return list(dict.fromkeys(ligne['pays'] for ligne in csv.DictReader(f)))
+
+
+# Pays UEMOA : une branche collecte -> transformation par pays, exécutées en parallèle
+PAYS_UEMOA = lire_pays()
 
 default_args = {
     'owner': 'uemoa_user',
@@ -11,29 +32,45 @@ default_args = {
     'retry_delay': timedelta(minutes=5)
 }
 
+
+def identifiant(pays):
+    """Identifiant de tâche Airflow (ASCII) : "Guinée-Bissau" -> "guinee_bissau"."""
+    ascii_ = unicodedata.normalize('NFKD', pays).encode('ascii', 'ignore').decode()
+    return ''.join(c if c.isalnum() else '_' for c in ascii_.lower())
+
+
 with DAG(
     dag_id='pipeline_bon_meteo_uemoa',
     default_args=default_args,
     schedule_interval='0 0 * * *',
     catchup=True,
     tags=['meteo', 'uemoa'],
-    description='Collecte, transformation et chargement météo UEMOA (14 jours)',
+    description='Collecte et transformation par pays en parallèle, puis chargement météo UEMOA (14 jours)',
 ) as dag:
 
-    collecter_donnees = BashOperator(
-        task_id='collecte_meteo',
-        bash_command='/Users/NOKHO/Desktop/Meteo/airflow_venv/bin/python3 /Users/NOKHO/Desktop/Meteo/openmeteo_uemoa.py'
-    )
-
-    transformer_donnees = BashOperator(
-        task_id='transformation_meteo',
-        bash_command='/Users/NOKHO/Desktop/Meteo/airflow_venv/bin/python3 /Users/NOKHO/Desktop/Meteo/transform_uemoa.py'
-    )
-
+    # Une seule tâche de chargement, même si un pays a échoué : les autres pays sont
+    # chargés, le pays en échec reste marqué en échec et sera rattrapé au prochain
+    # passage (collecte incrémentale).
     charger_donnees = BashOperator(
         task_id='chargement_entrepot',
-        bash_command='/Users/NOKHO/Desktop/Meteo/airflow_venv/bin/python3 /Users/NOKHO/Desktop/Meteo/load_uemoa.py'
+        bash_command=f'{PYTHON} {SCRIPTS}/load_uemoa.py',
+        trigger_rule=TriggerRule.ALL_DONE,
     )
 
-    collecter_donnees >> transformer_donnees >> charger_donnees
+    for pays in PAYS_UEMOA:
+        # Chaque tâche n'écrit que les partitions Pays=<pays> des datasets brut et nettoyé :
+        # un échec ne relance que la branche de ce pays
+        with TaskGroup(group_id=identifiant(pays)) as branche:
+            collecter_donnees = BashOperator(
+                task_id='collecte_meteo',
+                bash_command=f'{PYTHON} {SCRIPTS}/openmeteo_uemoa.py {shlex.quote(pays)}',
+            )
+
+            transformer_donnees = BashOperator(
+                task_id='transformation_meteo',
+                bash_command=f'{PYTHON} {SCRIPTS}/transform_uemoa.py {shlex.quote(pays)}',
+            )
+
+            collecter_donnees >> transformer_donnees
 
+        branche >> charger_donnees
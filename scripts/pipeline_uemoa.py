@@ -0,0 +1,11 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Collecte -> nettoyage -> chargement en mémoire, implémenté dans app/services/pipeline.py
+# (options : --pays, --debut, --fin, --complet, --checkpoint, --methode)
+from app.services.pipeline import main
+
+if __name__ == "__main__":
+    sys.exit(main())
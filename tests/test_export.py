@@ -0,0 +1,10 @@
+# tests/test_export.py
+"""En-tête de téléchargement des exports pour des noms de villes non ASCII."""
+from app.services.export import disposition_piece_jointe
+
+
+def test_disposition_encodable_en_latin1():
+    entete = disposition_piece_jointe("meteo_Birni N’Konni_2025-01-01.csv")
+    entete.encode("latin-1")
+    assert 'filename="meteo_Birni_NKonni_2025-01-01.csv"' in entete
+    assert "filename*=UTF-8''meteo_Birni%20N%E2%80%99Konni_2025-01-01.csv" in entete
@@ -0,0 +1,53 @@
+# tests/test_load.py
+"""
+Fusion staging -> faits_meteo (SQL_FUSION_FAITS) sur une base SQLite en
+mémoire : un second chargement de la même clé met la ligne à jour. Valeurs
+float32 du dataset liées telles qu'affichées (chemin execute_batch).
+"""
+import sqlite3
+
+import numpy as np
+
+from app.services.load import COLONNES_FAITS, MESURES, SQL_FUSION_FAITS, TABLE_STAGING, safe_float
+
+COLONNES = ", ".join(f"{col} REAL" for col in MESURES)
+
+
+def base_de_test():
+    conn = sqlite3.connect(":memory:")
+    conn.execute(f"""
+        CREATE TABLE faits_meteo (
+            datecollect TEXT NOT NULL, id_dim_lieu INTEGER NOT NULL, id_dim_condition INTEGER,
+            {COLONNES}, PRIMARY KEY (datecollect, id_dim_lieu)
+        )
+    """)
+    conn.execute(f"""
+        CREATE TABLE {TABLE_STAGING} (
+            datecollect TEXT NOT NULL, id_dim_lieu INTEGER NOT NULL, id_dim_condition INTEGER,
+            {COLONNES}
+        )
+    """)
+    return conn
+
+
+def charger(conn, temp, id_dim_condition):
+    ligne = {col: None for col in COLONNES_FAITS}
+    ligne.update(datecollect="2025-01-01", id_dim_lieu=1, id_dim_condition=id_dim_condition, temp=temp)
+    conn.execute(f"DELETE FROM {TABLE_STAGING}")
+    conn.execute(f"INSERT INTO {TABLE_STAGING} ({', '.join(ligne)}) VALUES ({', '.join('?' * len(ligne))})",
+                 list(ligne.values()))
+    conn.execute(SQL_FUSION_FAITS)
+
+
+def test_fusion_met_a_jour_la_ligne_existante():
+    conn = base_de_test()
+    charger(conn, temp=30.0, id_dim_condition=1)
+    charger(conn, temp=31.5, id_dim_condition=2)
+    lignes = conn.execute("SELECT datecollect, id_dim_lieu, id_dim_condition, temp FROM faits_meteo").fetchall()
+    assert lignes == [("2025-01-01", 1, 2, 31.5)]
+
+
+def test_mesures_float32_liees_par_leur_representation_courte():
+    assert safe_float(np.float32(28.3)) == 28.3
+    assert safe_float(np.float32(-0.1)) == -0.1
+    assert np.isnan(safe_float(np.float32("nan")))
@@ -0,0 +1,100 @@
+# tests/test_openmeteo.py
+"""
+Moteur de collecte Open-Meteo contre un serveur simulé (httpx.MockTransport) :
+relances sur 429 et 5xx, abandon sur les autres 4xx, limite de concurrence.
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.openmeteo import TokenBucket, collecter_villes_async, requeter_archive
+
+URL = "http://open-meteo.test/v1/archive"
+DAILY = {"time": ["2025-01-01"], "temperature_2m_mean": [27.5]}
+VILLES = [{"pays": "Mali", "ville": f"Ville {i}", "lat": 12.0 + i, "lon": -8.0} for i in range(6)]
+
+
+def limiteur():
+    return TokenBucket(rate=1000, capacity=1000)
+
+
+def requeter(reponses, **options):
+    """Lance `requeter_archive` contre un serveur renvoyant `reponses` dans l'ordre."""
+    appels = []
+
+    def serveur(request):
+        appels.append(request)
+        return reponses[len(appels) - 1]
+
+    async def executer():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(serveur)) as client:
+            return await requeter_archive(client, {"latitude": 12.0}, limiteur(), base_url=URL,
+                                          backoff_base=0, **options)
+
+    return asyncio.run(executer()), appels
+
+
+def test_relance_apres_429():
+    data, appels = requeter([
+        httpx.Response(429, headers={"Retry-After": "0.05"}),
+        httpx.Response(429),
+        httpx.Response(200, json={"daily": DAILY}),
+    ], max_retries=3)
+    assert data == {"daily": DAILY}
+    assert len(appels) == 3
+
+
+def test_429_suspend_les_envois():
+    limiter = limiteur()
+    limiter.penalize(0.2)
+
+    async def attendre():
+        debut = asyncio.get_running_loop().time()
+        await limiter.acquire()
+        return asyncio.get_running_loop().time() - debut
+
+    assert asyncio.run(attendre()) >= 0.15
+
+
+def test_erreur_levee_apres_les_tentatives():
+    with pytest.raises(httpx.HTTPStatusError):
+        requeter([httpx.Response(503)] * 3, max_retries=2)
+
+
+def test_pas_de_relance_sur_4xx():
+    appels = []
+
+    def serveur(request):
+        appels.append(request)
+        return httpx.Response(400)
+
+    async def executer():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(serveur)) as client:
+            await requeter_archive(client, {}, limiteur(), base_url=URL, max_retries=3, backoff_base=0)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(executer())
+    assert len(appels) == 1
+
+
+def test_limite_de_concurrence():
+    en_cours, pic = 0, 0
+
+    async def serveur(request):
+        nonlocal en_cours, pic
+        en_cours += 1
+        pic = max(pic, en_cours)
+        await asyncio.sleep(0.02)
+        en_cours -= 1
+        return httpx.Response(200, json={"daily": DAILY})
+
+    async def executer():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(serveur)) as client:
+            return await collecter_villes_async(VILLES, "2025-01-01", "2025-01-01", client=client,
+                                                base_url=URL, max_concurrency=2, rate_limit=1000,
+                                                burst=1000, batch_size=1, cache=False)
+
+    frames, echecs = asyncio.run(executer())
+    assert len(frames) == len(VILLES) and not echecs
+    assert pic == 2
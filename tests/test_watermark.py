@@ -0,0 +1,39 @@
+# tests/test_watermark.py
+"""
+Marques de collecte initialisées depuis l'entrepôt (base SQLite en mémoire) :
+les derniers jours sans température ne sont pas considérés comme collectés.
+"""
+import sqlite3
+from contextlib import closing
+
+from app.services.watermark import WatermarkStore
+
+
+class Entrepot:
+    """Connexion SQLite dont les curseurs s'utilisent avec `with`, comme ceux de psycopg2."""
+
+    def __init__(self):
+        self.conn = sqlite3.connect(":memory:")
+
+    def cursor(self):
+        return closing(self.conn.cursor())
+
+
+def entrepot_de_test():
+    entrepot = Entrepot()
+    entrepot.conn.executescript("""
+        CREATE TABLE dim_lieu (id_dim_lieu INTEGER PRIMARY KEY, pays TEXT, ville TEXT);
+        CREATE TABLE faits_meteo (datecollect TEXT, id_dim_lieu INTEGER, temp REAL);
+        INSERT INTO dim_lieu VALUES (1, 'Mali', 'Bamako'), (2, 'Niger', 'Niamey');
+        INSERT INTO faits_meteo VALUES
+            ('2025-01-01', 1, 25.0), ('2025-01-02', 1, 26.1), ('2025-01-03', 1, NULL),
+            ('2025-01-04', 1, NULL), ('2025-01-01', 2, NULL);
+    """)
+    return entrepot
+
+
+def test_marques_ignorent_les_jours_sans_temperature(tmp_path):
+    store = WatermarkStore(tmp_path / "marques.json")
+    store.charger_depuis_entrepot(entrepot_de_test())
+    assert store.get("Mali", "Bamako") == "2025-01-02"
+    assert store.get("Niger", "Niamey") is None